@@ -4,6 +4,7 @@ Inventory Distribution Streamlit App
 A user-friendly web interface for distributing inventory between stores.
 """
 
+import hashlib
 import io
 
 import streamlit as st
@@ -14,7 +15,7 @@ from core import (
     InventoryBalancer,
     DistributionConfig,
     parse_sales_file,
-    find_header_row,
+    load_excel_with_header,
 )
 from core.config import (
     PRODUCT_NAME_COLUMN,
@@ -153,9 +154,18 @@ with st.sidebar:
 
     if sales_file:
         try:
-            sales_data = parse_sales_file(sales_file)
-            st.session_state.sales_priority_data = sales_data
-            st.session_state.sales_file_name = sales_file.name
+            # Parse only when the uploaded content changes; every other widget
+            # interaction reruns the script with the same upload. Hash the
+            # bytes so an edited file with the same name and size is re-parsed
+            identity = hashlib.blake2b(sales_file.getvalue(), digest_size=16).hexdigest()
+            if (
+                identity != st.session_state.sales_file_identity
+                or st.session_state.sales_priority_data is None
+            ):
+                st.session_state.sales_priority_data = parse_sales_file(sales_file)
+                st.session_state.sales_file_name = sales_file.name
+                st.session_state.sales_file_identity = identity
+            sales_data = st.session_state.sales_priority_data
 
             # Show summary
             all_stores = set()
@@ -171,6 +181,7 @@ with st.sidebar:
         if st.session_state.sales_priority_data is not None:
             st.session_state.sales_priority_data = None
             st.session_state.sales_file_name = None
+            st.session_state.sales_file_identity = None
 
     # Show status when no file loaded
     if not st.session_state.sales_priority_data:
@@ -298,13 +309,12 @@ with tab1:
 
             # All reads use the current working inventory (reflects prior runs)
             working_stream = io.BytesIO(st.session_state.working_bytes_script1)
-            header_row, header_error = find_header_row(working_stream)
+            # One parse: header detection and the data frame share it
+            df, header_row, header_error = load_excel_with_header(working_stream)
             if header_error:
                 st.error(header_error)
                 st.info(f"Совет: Убедитесь, что в Excel файле есть столбец '{PRODUCT_NAME_COLUMN}' в заголовке.")
             else:
-                working_stream.seek(0)
-                df = pd.read_excel(working_stream, header=header_row, skiprows=[header_row + 1])
 
                 run_count = st.session_state.run_count_script1
                 if run_count == 0:
@@ -354,14 +364,20 @@ with tab1:
                         )
 
                         with st.spinner("Создание перемещений..."):
-                            new_results = distributor.execute(df_filtered, source, header_row)
+                            # One distribution pass feeds both the transfer files
+                            # and the updated inventory
+                            previews = distributor.preview(df_filtered, source, header_row)
+                            new_results = distributor.execute(
+                                df_filtered, source, header_row, previews=previews
+                            )
 
                             update_source = io.BytesIO(st.session_state.working_bytes_script1)
                             new_inventory = distributor.generate_updated_inventory(
                                 update_source,
                                 df_filtered,
                                 source,
-                                header_row
+                                header_row,
+                                previews=previews
                             )
 
                             existing_results = st.session_state.transfer_results_script1 or []
@@ -434,14 +450,13 @@ with tab2:
 
     if uploaded_file2:
         try:
-            # Auto-detect header row
-            header_row, header_error = find_header_row(uploaded_file2)
+            # Auto-detect header row and load in one parse (the sub-header row
+            # "Остаток на складе" right after the header is skipped)
+            df2, header_row, header_error = load_excel_with_header(uploaded_file2)
             if header_error:
                 st.error(header_error)
                 st.info(f"Совет: Убедитесь, что в Excel файле есть столбец '{PRODUCT_NAME_COLUMN}' в заголовке.")
             else:
-                # Skip the sub-header row (contains "Остаток на складе") right after header
-                df2 = pd.read_excel(uploaded_file2, header=header_row, skiprows=[header_row + 1])
                 st.success(f"Файл загружен: {len(df2)} строк (заголовок найден в строке {header_row + 1})")
 
                 # Validate
@@ -10,7 +10,10 @@ from .models import (
     SalesPriorityData,
     extract_store_id,
     build_store_id_map,
+    build_priority_rank,
     get_stock_value,
+    get_stock_matrix,
+    group_row_positions,
     count_sizes_with_stock,
 )
 from .sales_parser import (
@@ -25,7 +28,9 @@ from .file_loader import (
 )
 from .filters import (
     format_filter_value,
+    format_filter_values,
     extract_article_name,
+    extract_article_names,
     get_unique_article_types,
     get_unique_collections,
     get_unique_additional_names,
@@ -48,7 +53,10 @@ __all__ = [
     "SalesPriorityData",
     "extract_store_id",
     "build_store_id_map",
+    "build_priority_rank",
     "get_stock_value",
+    "get_stock_matrix",
+    "group_row_positions",
     "count_sizes_with_stock",
     # Sales parser
     "extract_product_code_from_sales",
@@ -60,7 +68,9 @@ __all__ = [
     "validate_required_columns",
     # Filters
     "format_filter_value",
+    "format_filter_values",
     "extract_article_name",
+    "extract_article_names",
     "get_unique_article_types",
     "get_unique_collections",
     "get_unique_additional_names",
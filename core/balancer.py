@@ -1,9 +1,10 @@
 """Inventory balancing logic - redistributes excess inventory between stores."""
 
+import sys
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Optional
-from collections import defaultdict
+from typing import Collection, Iterable, Iterator, Optional
 
 from .models import (
     Transfer,
@@ -13,10 +14,12 @@ from .models import (
     SalesPriorityData,
     SkippedStore,
     build_store_id_map,
-    get_stock_value,
-    count_sizes_with_stock,
+    build_priority_rank,
+    get_stock_matrix,
+    group_row_positions,
 )
 from .sales_parser import extract_product_code_from_input
+from .config import OUTPUT_COLUMNS
 
 
 # Balancer-local constants for the partner paired-store min-sizes rule.
@@ -31,6 +34,52 @@ def _should_apply_balancer_min_sizes_rule(partner_sizes_count: int, total_produc
             total_product_sizes >= _BALANCER_MIN_PRODUCT_SIZES)
 
 
+def _count_sizes_per_store(variant_codes: np.ndarray, has_stock: np.ndarray) -> np.ndarray:
+    """
+    Count distinct sizes with stock for every store column of one product.
+
+    Args:
+        variant_codes: Factorized int code of each row's variant
+        has_stock: bool (rows, stores) matrix of qty > 0
+
+    Returns:
+        int array (stores,) — same result as count_sizes_with_stock per store
+    """
+    # Sorting the int codes once serves both the uniqueness check and the runs
+    order = np.argsort(variant_codes, kind="stable")
+    run_starts = np.flatnonzero(np.diff(variant_codes[order], prepend=-1))
+    if run_starts.size == variant_codes.size:
+        # Common case: one row per size, so distinct sizes == rows with stock
+        return np.count_nonzero(has_stock, axis=0)
+    # Duplicate variant rows: OR the rows of each variant together (one
+    # reduceat per run of equal codes), then count variants per store
+    return np.count_nonzero(np.logical_or.reduceat(has_stock[order], run_starts, axis=0), axis=0)
+
+
+def _evaluate_partner_transfer(
+    has_excess: np.ndarray,
+    is_zero: np.ndarray,
+    sender_col: int,
+    partner_col: int,
+    partner_sizes_count: int,
+    total_product_sizes: int
+) -> tuple[bool, Optional[int]]:
+    """
+    Decide whether a paired sender may transfer to its partner for one product.
+
+    Operates on the product's bool matrices only (no pandas, no dicts).
+
+    Returns:
+        (can_transfer, transferable_sizes) — transferable_sizes is None when the
+        min sizes rule does not apply to this product/partner
+    """
+    if not _should_apply_balancer_min_sizes_rule(partner_sizes_count, total_product_sizes):
+        return True, None
+    # Sizes where sender has excess AND partner has 0
+    transferable_sizes = int(np.count_nonzero(has_excess[:, sender_col] & is_zero[:, partner_col]))
+    return transferable_sizes >= _BALANCER_MIN_SIZES_TO_ADD, transferable_sizes
+
+
 class InventoryBalancer:
     """
     Balances inventory between stores.
@@ -52,116 +101,188 @@ class InventoryBalancer:
         self.sales_data = sales_data
         # Build store ID to name mapping for matching sales data
         self._store_id_map = build_store_id_map(config.store_priority)
+        # Store name -> position in store_priority, the sales tiebreaker
+        self._priority_rank = build_priority_rank(config.store_priority)
+        # Full store name -> code ("125006 KZN-PC-Мега" -> "125006") for grouping
+        self._store_code_cache = {s: s.split()[0] for s in config.store_priority}
+        # Reverse lookup for balance pairs: code -> full store name (first wins)
+        self._code_to_store: dict[str, str] = {}
+        for store, code in self._store_code_cache.items():
+            self._code_to_store.setdefault(code, store)
+        # (product_name, available_stores) -> _get_product_priority result; the
+        # inputs are fixed per instance, so repeated preview calls reuse it
+        self._priority_cache: dict[tuple[str, tuple[str, ...]], tuple[np.ndarray, bool]] = {}
+        # Store sets for O(1) membership checks, built once per balancer
+        self._excluded_store_set = frozenset(config.excluded_stores)
 
     def _analyze_products(
         self,
         df: pd.DataFrame,
         available_stores: list[str],
-        header_row: int = 0
+        stock_matrix: np.ndarray
     ) -> dict:
         """
         Analyze inventory by product to understand size distribution.
 
+        Args:
+            df: Filtered input DataFrame
+            available_stores: Store columns present in df
+            stock_matrix: get_stock_matrix(df, available_stores), coerced once by the caller
+
         Returns:
             Dict with product name as key, containing:
-            - rows: list of row dicts with variant, store_quantities, excel_row, original_idx
+            - variants: stripped variant per row (sheet order)
+            - rows: int array of the product's row positions in df / stock_matrix
             - total_sizes: count of all sizes for this product
+            - has_excess / is_zero: bool matrices (rows x available_stores) of
+              qty > balance_threshold and qty == 0, for the min sizes rule
+            - sizes_with_stock: int array (available_stores,) of distinct sizes
+              each store holds (qty > 0)
         """
-        product_data: dict = defaultdict(lambda: {"rows": [], "total_sizes": 0})
-
-        for original_idx, row in df.iterrows():
-            product = row[self.config.product_name_column]
-            if pd.isna(product) or product == "":
-                continue
-
-            product_name = str(product)
-            variant = row.get(self.config.variant_column, "")
-            variant_str = str(variant).strip() if pd.notna(variant) else ""
-            if variant_str == "":
-                continue
-
-            # Build store quantities for this row
-            store_quantities = {}
-            for store in available_stores:
-                store_quantities[store] = get_stock_value(row.get(store, 0))
-
-            excel_row = header_row + 3 + original_idx
-
-            product_data[product_name]["rows"].append({
-                "excel_row": excel_row,
-                "original_idx": original_idx,
-                "variant": variant_str,
-                "store_quantities": store_quantities,
-            })
-
-        # Calculate total sizes per product
-        for product_name, data in product_data.items():
-            data["total_sizes"] = len(data["rows"])
-
-        return dict(product_data)
+        if self.config.variant_column not in df.columns:
+            return {}
+
+        # Vectorized row validation: non-empty product and non-empty variant
+        product_series = df[self.config.product_name_column]
+        variant_series = df[self.config.variant_column]
+        variant_strs = variant_series.where(variant_series.notna(), "").astype(str).str.strip()
+        valid = product_series.notna() & (product_series != "") & (variant_strs != "")
+
+        product_names = product_series[valid].astype(str).to_numpy()
+        variant_names = variant_strs[valid].to_numpy()
+        # Int codes for distinct-size counting (sorting ints, not strings)
+        variant_codes = pd.factorize(variant_names)[0]
+        valid_mask = valid.to_numpy()
+        valid_rows = np.flatnonzero(valid_mask)
+        valid_stock = stock_matrix[valid_mask]
+        has_excess = valid_stock > self.config.balance_threshold
+        has_stock = valid_stock > 0
+        is_zero = ~has_stock
+
+        # Group row positions by product (first-appearance order, rows in sheet order);
+        # every per-product field is a slice of the shared arrays, no per-row dicts
+        product_data: dict = {}
+        groups = group_row_positions(product_names)
+        for product_name, positions in groups.items():
+            variants = variant_names[positions].tolist()
+            product_data[sys.intern(product_name)] = {
+                "variants": variants,
+                "rows": valid_rows[positions],
+                "total_sizes": len(positions),
+                "has_excess": has_excess[positions],
+                "is_zero": is_zero[positions],
+                "sizes_with_stock": _count_sizes_per_store(
+                    variant_codes[positions], has_stock[positions]
+                ),
+            }
+
+        return product_data
 
     def _get_product_priority(
         self,
         product_name: str,
-        available_stores: list[str]
-    ) -> tuple[list[str], bool]:
+        store_to_col: dict[str, int],
+        fallback_cols: np.ndarray
+    ) -> tuple[np.ndarray, bool]:
         """
         Get store priority for a specific product.
 
         Args:
             product_name: Product name from Номенклатура column
-            available_stores: List of stores that exist in the DataFrame
+            store_to_col: Store name -> column index for stores that exist in the DataFrame
+            fallback_cols: Column indices of active, available stores in static priority order
 
         Returns:
-            Tuple of (active_store_list_in_priority_order, uses_fallback)
+            Tuple of (active_store_columns_in_priority_order, uses_fallback)
+            The column array is cached and shared between calls; callers must not mutate it.
         """
-        # Default: use static priority
-        fallback_priority = [s for s in self.config.active_stores if s in available_stores]
+        key = (product_name, tuple(store_to_col))
+        cached = self._priority_cache.get(key)
+        if cached is None:
+            cached = self._priority_cache[key] = self._compute_product_priority(
+                product_name, store_to_col, fallback_cols
+            )
+        return cached
 
+    def _compute_product_priority(
+        self,
+        product_name: str,
+        store_to_col: dict[str, int],
+        fallback_cols: np.ndarray
+    ) -> tuple[np.ndarray, bool]:
+        """Uncached body of _get_product_priority."""
         if not self.sales_data:
-            return fallback_priority, False
+            return fallback_cols, False
 
         # Extract product code from input file format
         product_code = extract_product_code_from_input(product_name)
         if not product_code:
-            return fallback_priority, True
+            return fallback_cols, True
 
         # Look up in sales data
         priority, found = self.sales_data.get_product_priority(
             product_code,
             self.config.store_priority,
-            self._store_id_map
+            self._store_id_map,
+            self._priority_rank
         )
 
         if not found:
-            return fallback_priority, True
-
-        # Filter to available stores only and maintain sales-based order
-        active_priority = [s for s in priority if s in available_stores and s in self.config.active_stores]
+            return fallback_cols, True
+
+        # Sales-based order first, restricted to active/available stores; a
+        # bool mask over columns replaces repeated list membership tests
+        pending = np.zeros(len(store_to_col), dtype=bool)
+        pending[fallback_cols] = True
+        ordered: list[int] = []
+        for store in priority:
+            col = store_to_col.get(store)
+            if col is not None and pending[col]:
+                pending[col] = False
+                ordered.append(col)
 
         # Add any stores that weren't in sales data but are in available/active
-        for store in fallback_priority:
-            if store not in active_priority:
-                active_priority.append(store)
+        ordered.extend(col for col in fallback_cols.tolist() if pending[col])
 
-        return active_priority, False
+        return np.array(ordered, dtype=np.intp), False
 
-    def _find_store_by_code(self, store_code: str, stores: list[str]) -> Optional[str]:
+    def _find_store_by_code(self, store_code: str, stores: Collection[str]) -> Optional[str]:
         """
         Find full store name by its code prefix.
 
         Args:
             store_code: Store ID prefix (e.g., "125004")
-            stores: List of full store names to search
+            stores: Full store names the result must belong to (a set for O(1) checks)
 
         Returns:
             Full store name if found, None otherwise
         """
-        for store in stores:
-            if store.startswith(store_code + " "):
-                return store
+        store = self._code_to_store.get(store_code)
+        if store is not None and store in stores:
+            return store
         return None
 
+    def _get_partner_map(self, product_stores: list[str]) -> dict[str, Optional[str]]:
+        """
+        Map each store code in product_stores to its balance-pair partner.
+
+        Args:
+            product_stores: Full store names in product priority order
+
+        Returns:
+            Dict of store code -> partner's full store name (None if the store
+            is unpaired or its partner is not among product_stores)
+        """
+        partner_map: dict[str, Optional[str]] = {}
+        store_set = set(product_stores)
+        for store in product_stores:
+            store_code = self._store_code_cache[store]
+            partner_code = self.config.get_paired_store(store_code)
+            partner_map[store_code] = (
+                self._find_store_by_code(partner_code, store_set) if partner_code else None
+            )
+        return partner_map
+
     def preview(self, df: pd.DataFrame, header_row: int = 0) -> list[TransferPreview]:
         """
         Generate preview of balancing operations without executing.
@@ -173,9 +294,20 @@ class InventoryBalancer:
         Returns:
             List of TransferPreview objects showing planned redistributions
         """
-        # Filter valid rows
-        df_filtered = df[df[self.config.product_name_column].notna()].copy()
-        df_filtered = df_filtered[df_filtered[self.config.product_name_column] != ""]
+        return list(self._iter_previews(df, header_row))
+
+    def _iter_previews(self, df: pd.DataFrame, header_row: int) -> Iterator[TransferPreview]:
+        """Yield one TransferPreview per valid row, in row order."""
+        # Config values used inside the row loop, bound once as locals
+        product_column = self.config.product_name_column
+        variant_column = self.config.variant_column
+        threshold = self.config.balance_threshold
+        excluded = self._excluded_store_set
+        has_sales_data = self.sales_data is not None
+
+        # Filter valid rows (single mask, no copy — preview only reads df_filtered)
+        product_col = df[product_column]
+        df_filtered = df.loc[product_col.notna() & (product_col != "")]
 
         # Get all stores that exist in the DataFrame (for analysis)
         available_stores = [
@@ -184,22 +316,46 @@ class InventoryBalancer:
         ]
 
         # Analyze products for minimum sizes rule
-        product_data = self._analyze_products(df_filtered, available_stores, header_row)
+        # Coerce all store columns to ints once; analysis and the row loop share it
+        stock_matrix = get_stock_matrix(df_filtered, available_stores)
+        product_data = self._analyze_products(df_filtered, available_stores, stock_matrix)
 
         # Track which product/partner combinations have been evaluated for min sizes rule
         # Key: (product_name, partner_store), Value: bool (can_transfer_to_partner)
         partner_transfer_decisions: dict[tuple[str, str], bool] = {}
 
-        # Track working inventory across all rows (for paired store balancing)
-        # Key: (product_name, variant, store), Value: current inventory
-        working_inventory: dict[tuple[str, str, str], int] = {}
-
-        # Initialize working inventory from product_data
+        # Track which (product_name, variant) x store cells still need a unit
+        # (for paired store balancing). Pair transfers only check for 0 and
+        # then give exactly 1, so a uint8 flag matrix over stock_matrix rows is
+        # the whole state; each (product, variant) maps to its stock_matrix row.
+        inventory_row_of: dict[tuple[str, str], int] = {}
         for product_name, data in product_data.items():
-            for row_data in data["rows"]:
-                variant = row_data["variant"]
-                for store, qty in row_data["store_quantities"].items():
-                    working_inventory[(product_name, variant, store)] = qty
+            inventory_row_of.update(
+                ((product_name, variant), row)
+                for variant, row in zip(data["variants"], data["rows"].tolist())
+            )
+        needs_unit = (stock_matrix == 0).astype(np.uint8)
+
+        # Store priority and balance-pair partners depend only on the product,
+        # not on the size row: resolve them once per product instead of once per row.
+        # store_cols maps each priority position to its column in stock_matrix.
+        store_to_col = {store: col for col, store in enumerate(available_stores)}
+        product_priority: dict[
+            str, tuple[list[str], bool, dict[str, Optional[str]], np.ndarray]
+        ] = {}
+        fallback_cols = np.array(
+            [store_to_col[s] for s in self.config.active_stores if s in store_to_col], dtype=np.intp
+        )
+
+        for product_name in product_data:
+            store_cols, uses_fallback = self._get_product_priority(product_name, store_to_col, fallback_cols)
+            product_stores = [available_stores[col] for col in store_cols.tolist()]
+            product_priority[product_name] = (
+                product_stores, uses_fallback, self._get_partner_map(product_stores), store_cols
+            )
+
+        # Excess over the threshold for every row/store at once (0 where none)
+        excess_matrix = np.maximum(stock_matrix - threshold, 0)
 
         # Track products with <4 sizes (standard distribution, no min sizes rule)
         products_under_4_sizes: set[str] = set()
@@ -207,143 +363,117 @@ class InventoryBalancer:
             if data["total_sizes"] < _BALANCER_MIN_PRODUCT_SIZES:
                 products_under_4_sizes.add(product_name)
 
-        # Track rows where partner was skipped due to min sizes rule
-        # Key: original_idx, Value: (partner_store, transferable_sizes)
-        min_sizes_skipped_info: dict[int, tuple[str, int]] = {}
-
-        # Track skipped stores per row
-        skipped_stores_per_row: dict[int, list[SkippedStore]] = defaultdict(list)
-
-        previews = []
-
-        for idx, (original_idx, row) in enumerate(df_filtered.iterrows()):
-            product = row[self.config.product_name_column]
-            variant = row.get(self.config.variant_column, "")
-            product_name = str(product) if pd.notna(product) else ""
-
-            variant_str_check = str(variant).strip() if pd.notna(variant) else ""
-            if variant_str_check == "":
+        # Partners skipped due to min sizes rule, recorded once per product.
+        # Key: product_name, Value: SkippedStore list shared by every row of the
+        # product emitted after the first block, so partners blocked later in the
+        # product still show up on those earlier rows
+        min_sizes_skipped: dict[str, list[SkippedStore]] = {}
+        # Key: product_name, Value: (partner_store, transferable_sizes) of the latest block
+        min_sizes_last: dict[str, tuple[str, int]] = {}
+
+        # Extract the needed columns once as string arrays (null -> ""); the row
+        # loop below only indexes into them, with no per-row isna/str calls
+        products = df_filtered[product_column].fillna("").astype(str).tolist()
+        if variant_column in df_filtered.columns:
+            variant_series = df_filtered[variant_column].fillna("").astype(str)
+            variants = variant_series.tolist()
+            variant_keys = variant_series.str.strip().tolist()
+        else:
+            variants = variant_keys = [""] * len(df_filtered)
+        original_indices = df_filtered.index.tolist()
+
+        for pos, original_idx in enumerate(original_indices):
+            product_name = products[pos]
+            variant = variants[pos]
+            variant_key = variant_keys[pos]
+            if variant_key == "":
                 continue
 
             excel_row = header_row + 3 + original_idx
 
             # Get product-specific store priority
-            product_stores, uses_fallback = self._get_product_priority(product_name, available_stores)
+            product_stores, uses_fallback, partner_map, store_cols = product_priority[product_name]
 
             preview = TransferPreview(
                 row_index=excel_row,
                 product_name=product_name,
-                variant=str(variant) if pd.notna(variant) else "",
-                uses_fallback_priority=uses_fallback and self.sales_data is not None,
+                variant=variant,
+                uses_fallback_priority=uses_fallback and has_sales_data,
             )
 
             # Get product info for minimum sizes rule
-            prod_info = product_data.get(product_name, {"rows": [], "total_sizes": 1})
+            prod_info = product_data[product_name]
             total_product_sizes = prod_info["total_sizes"]
-            product_rows = prod_info["rows"]
-
-            # Build inventory map for this row
-            store_inventory = {}
-            for store in product_stores:
-                store_inventory[store] = get_stock_value(row.get(store, 0))
 
-            # Find stores with excess inventory (> threshold)
-            stores_with_excess = [
-                (store, qty) for store, qty in store_inventory.items()
-                if qty > self.config.balance_threshold
-            ]
+            # Find stores with excess inventory (> threshold), in priority order
+            row_excess = excess_matrix[pos, store_cols]
+            with_excess = np.flatnonzero(row_excess)
 
-            if not stores_with_excess:
-                previews.append(preview)
+            if with_excess.size == 0:
+                yield preview
                 continue
 
-            # Sort by quantity descending (take from highest first)
-            stores_with_excess.sort(key=lambda x: x[1], reverse=True)
+            # Sort by excess descending (take from highest first); the stable sort
+            # keeps priority order among stores with equal excess
+            sender_order = with_excess[np.argsort(-row_excess[with_excess], kind="stable")]
 
-            # Process each store with excess
-            for sender_store, sender_qty in stores_with_excess:
-                excess = sender_qty - self.config.balance_threshold
-
-                if excess <= 0:
-                    continue
+            # (sender, receiver, quantity) triples, materialized as Transfers once per row
+            row_transfers: list[tuple[str, str, int]] = []
 
-                remaining_excess = excess
+            # Process each store with excess
+            for store_pos in sender_order.tolist():
+                sender_store = product_stores[store_pos]
+                remaining_excess = int(row_excess[store_pos])
                 sender_code = sender_store.split()[0]
 
-                # Check if sender is in a balance pair
-                partner_code = self.config.get_paired_store(sender_code)
-
-                if partner_code:
-                    partner_store = self._find_store_by_code(partner_code, product_stores)
-
-                    if (partner_store and
-                            partner_store not in self.config.excluded_stores):
-
-                        decision_key = (product_name, partner_store)
-
-                        # Check if we already evaluated this product/partner combination
-                        if decision_key not in partner_transfer_decisions:
-                            # Evaluate minimum sizes rule for this product/partner
-                            partner_sizes_count = count_sizes_with_stock(product_rows, partner_store)
-
-                            if _should_apply_balancer_min_sizes_rule(partner_sizes_count, total_product_sizes):
-                                # Count how many sizes sender can transfer
-                                # (sizes where sender has excess AND partner has 0)
-                                transferable_sizes = 0
-                                for row_info in product_rows:
-                                    sender_qty_row = row_info["store_quantities"].get(sender_store, 0)
-                                    partner_qty_row = row_info["store_quantities"].get(partner_store, 0)
-                                    if sender_qty_row > self.config.balance_threshold and partner_qty_row == 0:
-                                        transferable_sizes += 1
-
-                                # Can only transfer if 3+ sizes available
-                                can_transfer_decision = transferable_sizes >= _BALANCER_MIN_SIZES_TO_ADD
-                                partner_transfer_decisions[decision_key] = can_transfer_decision
-
-                                # Track if min sizes rule blocked the transfer
-                                if not can_transfer_decision:
-                                    # Mark all rows of this product as skipped due to min sizes
-                                    for row_info in product_rows:
-                                        row_orig_idx = row_info["original_idx"]
-                                        min_sizes_skipped_info[row_orig_idx] = (
-                                            partner_store, transferable_sizes
-                                        )
-                                        skipped_stores_per_row[row_orig_idx].append(
-                                            SkippedStore(
-                                                store_name=partner_store,
-                                                reason="min_sizes",
-                                                existing_qty=0
-                                            )
-                                        )
-                            else:
-                                # Min sizes rule doesn't apply, allow normal transfer
-                                partner_transfer_decisions[decision_key] = True
-
-                        can_transfer = partner_transfer_decisions[decision_key]
-
-                        if can_transfer:
-                            # Check if partner needs this specific variant
-                            variant_str = str(variant) if pd.notna(variant) else ""
-                            partner_qty = working_inventory.get(
-                                (product_name, variant_str, partner_store), 0
+                # Check if sender is in a balance pair (partner resolved once per product)
+                partner_store = partner_map.get(sender_code)
+
+                if (partner_store and
+                        partner_store not in excluded):
+
+                    decision_key = (product_name, partner_store)
+
+                    # Check if we already evaluated this product/partner combination
+                    # (single dict probe; None means not evaluated yet)
+                    can_transfer = partner_transfer_decisions.get(decision_key)
+                    if can_transfer is None:
+                        # Evaluate minimum sizes rule for this product/partner
+                        partner_col = store_to_col[partner_store]
+                        partner_sizes_count = int(prod_info["sizes_with_stock"][partner_col])
+                        can_transfer_decision, transferable_sizes = _evaluate_partner_transfer(
+                            prod_info["has_excess"],
+                            prod_info["is_zero"],
+                            store_to_col[sender_store],
+                            partner_col,
+                            partner_sizes_count,
+                            total_product_sizes,
+                        )
+                        partner_transfer_decisions[decision_key] = can_transfer = can_transfer_decision
+
+                        # Track if min sizes rule blocked the transfer (marks
+                        # every remaining row of this product, no per-row loop)
+                        if not can_transfer_decision:
+                            min_sizes_skipped.setdefault(product_name, []).append(
+                                SkippedStore(store_name=partner_store, reason="min_sizes", existing_qty=0)
                             )
+                            min_sizes_last[product_name] = (partner_store, transferable_sizes)
+
+                    if can_transfer:
+                        # Check if partner needs this specific variant
+                        inventory_row = inventory_row_of[(product_name, variant_key)]
+                        partner_col = store_to_col[partner_store]
 
-                            if partner_qty == 0 and remaining_excess > 0:
-                                preview.transfers.append(Transfer(
-                                    sender=sender_code,
-                                    receiver=partner_store,
-                                    quantity=1
-                                ))
-                                working_inventory[(product_name, variant_str, partner_store)] = 1
-                                remaining_excess -= 1
+                        if needs_unit[inventory_row, partner_col] and remaining_excess > 0:
+                            row_transfers.append((sender_code, partner_store, 1))
+                            needs_unit[inventory_row, partner_col] = 0
+                            remaining_excess -= 1
 
                 # All remaining excess goes to Stock (paired or not)
                 if remaining_excess > 0:
-                    preview.transfers.append(Transfer(
-                        sender=sender_code,
-                        receiver="Сток",
-                        quantity=remaining_excess
-                    ))
+                    row_transfers.append((sender_code, "Сток", remaining_excess))
+
+            preview.transfers = [Transfer(*t) for t in row_transfers]
 
             # Set indicator flags on preview
             # 1. Standard distribution (product has <4 sizes, min sizes rule doesn't apply)
@@ -351,55 +481,59 @@ class InventoryBalancer:
                 preview.uses_standard_distribution = True
 
             # 2. Target not reached (partner was skipped due to min sizes rule)
-            if original_idx in min_sizes_skipped_info:
+            # 3. Add skipped stores to preview
+            last_skip = min_sizes_last.get(product_name)
+            if last_skip:
                 preview.target_not_reached = True
-                partner_store, transferable = min_sizes_skipped_info[original_idx]
+                partner_store, transferable = last_skip
                 preview.skip_reason = (
                     f"Недостаточно размеров для партнёра {partner_store.split()[0]} "
                     f"(есть {transferable}, нужно ≥{_BALANCER_MIN_SIZES_TO_ADD})"
                 )
+                preview.skipped_stores = min_sizes_skipped[product_name]
 
-            # 3. Add skipped stores to preview
-            if original_idx in skipped_stores_per_row:
-                preview.skipped_stores = skipped_stores_per_row[original_idx]
-
-            previews.append(preview)
+            yield preview
 
-        return previews
-
-    def execute(self, df: pd.DataFrame, header_row: int = 0) -> list[TransferResult]:
+    def execute(
+        self,
+        df: pd.DataFrame,
+        header_row: int = 0,
+        previews: Optional[Iterable[TransferPreview]] = None
+    ) -> list[TransferResult]:
         """
         Execute balancing and return transfer results.
 
         Args:
             df: Input DataFrame (already loaded with correct header row)
             header_row: 0-indexed header row in Excel
+            previews: Result of a preview() call on the same df, to skip
+                recomputing the balancing (e.g. from another balancer instance)
 
         Returns:
             List of TransferResult objects ready for download
         """
-        # Get preview (contains all transfers)
-        previews = self.preview(df, header_row)
+        # Get preview (contains all transfers); streamed lazily so transfers are
+        # grouped without materializing the full preview list first
+        if previews is None:
+            previews = self._iter_previews(df, header_row)
 
-        # Group transfers by (sender, receiver)
-        transfers_grouped: dict[tuple[str, str], list[tuple[str, str, int]]] = {}
+        # Group transfers by (sender, receiver) as column lists
+        # (products, variants, quantities) - no tuple per transfer
+        transfers_grouped: dict[tuple[str, str], tuple[list[str], list[str], list[int]]] = {}
+        store_codes = self._store_code_cache
 
         for preview in previews:
             for transfer in preview.transfers:
-                # Extract receiver code
-                if transfer.receiver == "Сток":
-                    receiver_code = "Сток"
-                else:
-                    receiver_code = transfer.receiver.split()[0]
-
+                # Receiver is either "Сток" or a full store name from config
+                receiver = transfer.receiver
+                receiver_code = store_codes.get(receiver) or receiver.split()[0]
                 key = (transfer.sender, receiver_code)
-                if key not in transfers_grouped:
-                    transfers_grouped[key] = []
-                transfers_grouped[key].append((
-                    preview.product_name,
-                    preview.variant,
-                    transfer.quantity
-                ))
+                columns = transfers_grouped.get(key)
+                if columns is None:
+                    columns = transfers_grouped[key] = ([], [], [])
+                columns[0].append(preview.product_name)
+                columns[1].append(preview.variant)
+                columns[2].append(transfer.quantity)
 
         # Filter out self-transfers (shouldn't happen, but safety check)
         regular_transfers = {
@@ -407,31 +541,37 @@ class InventoryBalancer:
             if k[0] != k[1]
         }
 
-        # Create results
+        # Create results (one DataFrame per group)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        results = []
-
-        for (sender, receiver), items in regular_transfers.items():
-            # Create DataFrame for this transfer
-            output_df = pd.DataFrame({
-                "Артикул": [""] * len(items),
-                "Код номенклатуры": [""] * len(items),
-                "Номенклатура": [item[0] for item in items],
-                "Характеристика": [item[1] for item in items],
-                "Назначение": [""] * len(items),
-                "Серия": [""] * len(items),
-                "Код упаковки": [""] * len(items),
-                "Упаковка": [""] * len(items),
-                "Количество": [item[2] for item in items],
-            })
-
-            filename = f"{sender}_to_{receiver}_{timestamp}.xlsx"
-
-            results.append(TransferResult(
-                sender=sender,
-                receiver=receiver,
-                filename=filename,
-                data=output_df
-            ))
-
-        return results
+        return [
+            self._build_result(key, columns, timestamp)
+            for key, columns in regular_transfers.items()
+        ]
+
+    def _build_result(
+        self,
+        key: tuple[str, str],
+        columns: tuple[list[str], list[str], list[int]],
+        timestamp: str
+    ) -> TransferResult:
+        """Build the output DataFrame and TransferResult for one (sender, receiver) group."""
+        sender, receiver = key
+
+        # Only the three data columns are built; reindex adds the empty
+        # placeholder columns in OUTPUT_COLUMNS order. Product/variant repeat
+        # heavily within a group, so they are stored as categoricals.
+        products, variants, quantities = columns
+        output_df = pd.DataFrame({
+            "Номенклатура": pd.Categorical(products),
+            "Характеристика": pd.Categorical(variants),
+            "Количество": np.array(quantities, dtype=np.int64),
+        }).reindex(columns=OUTPUT_COLUMNS, fill_value="")
+
+        filename = f"{sender}_to_{receiver}_{timestamp}.xlsx"
+
+        return TransferResult(
+            sender=sender,
+            receiver=receiver,
+            filename=filename,
+            data=output_df
+        )
@@ -35,6 +35,22 @@ MAX_UNITS_PER_SIZE = 3           # UI cap for units_per_size
 DEFAULT_MIN_PRODUCT_SIZES = 1    # Product size-count range filter: lower bound
 DEFAULT_MAX_PRODUCT_SIZES = 99   # Product size-count range filter: upper bound
 
+# pandas read_excel engine: calamine parses xlsx in compiled code (python-calamine),
+# openpyxl is the fallback for environments without the wheel
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+# DataFrame.to_excel engine for plain (unstyled) exports: XlsxWriter writes rows
+# straight to XML without building openpyxl cell objects
+try:
+    import xlsxwriter  # noqa: F401
+    EXCEL_WRITER_ENGINE = "xlsxwriter"
+except ImportError:
+    EXCEL_WRITER_ENGINE = "openpyxl"
+
 # Column names (these are fixed based on input format)
 STOCK_COLUMN = "Сток"
 PHOTO_STOCK_COLUMN = "Фото склад"
@@ -23,10 +23,11 @@ the next phase begins (fair distribution).
         For each store: for every size currently at 2 units, transfer +1 if stock left.
 """
 
+import sys
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from typing import Optional, BinaryIO
-from collections import defaultdict
 
 from .models import (
     Transfer,
@@ -35,14 +36,95 @@ from .models import (
     DistributionConfig,
     SalesPriorityData,
     SkippedStore,
+    ProductBlock,
     UpdatedInventoryResult,
     build_store_id_map,
-    get_stock_value,
+    build_priority_rank,
+    get_stock_matrix,
+    group_row_positions,
 )
 from .sales_parser import extract_product_code_from_input
 from .config import OUTPUT_COLUMNS
 
 
+def _plan_product_transfers(
+    qty: np.ndarray,
+    remaining: np.ndarray,
+    cols: np.ndarray,
+    target: int,
+    units: int
+) -> tuple[np.ndarray, list[np.ndarray]]:
+    """
+    Plan Phases 1-3 for one product (array-only kernel, no pandas or strings).
+
+    Args:
+        qty: int64 (rows, stores) store quantities; updated in place
+        remaining: int64 (rows,) source stock per row; updated in place
+        cols: Column indices into qty of the participating stores, in priority order
+        target: target_sizes_filled
+        units: units_per_size
+
+    Returns:
+        (skip, allocations): skip is a (rows, len(cols)) bool mask of Phase 1
+        target_not_reached cells; allocations holds one (rows, len(cols)) bool
+        mask per executed phase, each True cell being a 1-unit transfer.
+    """
+    # ===== Phase 1: Reach size-count target =====
+    # Filled sizes per store, counted once per product. Phase 1 only
+    # writes to the column of the store being visited and visits each
+    # store once, so these counts (and the empty mask) stay exact.
+    filled = np.count_nonzero(qty > 0, axis=0)[cols]
+    empty = qty[:, cols] == 0
+    needy = filled < target  # Target already met — Phase 1 does nothing
+    alloc = np.zeros_like(empty)
+    skip = np.zeros_like(empty)
+
+    if not remaining.any():
+        # No source stock for this product (e.g. an empty Фото склад column):
+        # nothing moves in any phase, and every below-target store has zero
+        # transferable sizes, so all of its empty cells are target_not_reached
+        skip = empty & needy
+        return skip, [alloc]
+
+    if np.all(remaining >= np.count_nonzero(empty[:, needy], axis=1)):
+        # Uncontended: every row has stock for every store that could
+        # ask for it, so no store can starve a later one and the
+        # all-or-nothing decision is independent per store.
+        eligible = needy & (filled + np.count_nonzero(empty, axis=0) >= target)
+        alloc = empty & eligible
+        skip = empty & (needy & ~eligible)
+        qty[:, cols] += alloc
+        remaining -= np.count_nonzero(alloc, axis=1).astype(remaining.dtype)
+    else:
+        # Only stores below target take part; the rest keep their columns untouched
+        for k in np.flatnonzero(needy).tolist():
+            col = cols[k]
+            transferable = empty[:, k] & (remaining > 0)
+            if filled[k] + int(np.count_nonzero(transferable)) < target:
+                skip[:, k] = empty[:, k]  # All-or-nothing: skip store
+                continue
+            # Eligible — transfer 1 unit to each transferable size
+            alloc[:, k] = transferable
+            qty[transferable, col] += 1
+            remaining[transferable] -= 1
+
+    allocations = [alloc]
+
+    # ===== Phases 2-3: Top up to 2, then 3 units per size =====
+    # Within a phase each row is independent: the stores at the current
+    # level take one unit each in priority order until the row's stock
+    # runs out, i.e. the first `remaining` eligible stores (cumsum mask).
+    if cols.size:
+        for level in range(1, min(units, 3)):
+            eligible = qty[:, cols] == level
+            send = eligible & (np.cumsum(eligible, axis=1) <= remaining[:, None])
+            qty[:, cols] += send
+            remaining -= np.count_nonzero(send, axis=1).astype(remaining.dtype)
+            allocations.append(send)
+
+    return skip, allocations
+
+
 class StockDistributor:
     """Distributes inventory from Сток/Фото склад to stores using a phased algorithm."""
 
@@ -54,6 +136,17 @@ class StockDistributor:
         self.config = config
         self.sales_data = sales_data
         self._store_id_map = build_store_id_map(config.store_priority)
+        # Store name -> position in store_priority, the sales tiebreaker
+        self._priority_rank = build_priority_rank(config.store_priority)
+        # Full store name -> code ("125006 KZN-PC-Мега" -> "125006") for grouping
+        self._store_code_cache = {s: s.split()[0] for s in config.store_priority}
+        # (product_name, available_stores) -> _get_product_priority result; the
+        # inputs are fixed per instance, so repeated preview/execute calls reuse it
+        self._priority_cache: dict[tuple[str, tuple[str, ...]], tuple[list[str], bool, list[str]]] = {}
+        self._active_store_set = frozenset(config.active_stores)
+        self._excluded_store_set = frozenset(config.excluded_stores)
+        # available_stores -> (full_priority, fallback_priority); shared by all products
+        self._base_priority_cache: dict[tuple[str, ...], tuple[list[str], list[str]]] = {}
 
     def _get_product_priority(
         self,
@@ -65,9 +158,31 @@ class StockDistributor:
 
         Returns:
             (active_priority, uses_fallback, full_priority_with_excluded)
+            The lists are cached and shared between calls; callers must not mutate them.
         """
-        full_priority = [s for s in self.config.store_priority if s in available_stores]
-        fallback_priority = [s for s in self.config.active_stores if s in available_stores]
+        key = (product_name, tuple(available_stores))
+        cached = self._priority_cache.get(key)
+        if cached is None:
+            cached = self._priority_cache[key] = self._compute_product_priority(
+                product_name, available_stores
+            )
+        return cached
+
+    def _compute_product_priority(
+        self,
+        product_name: str,
+        available_stores: list[str]
+    ) -> tuple[list[str], bool, list[str]]:
+        """Uncached body of _get_product_priority."""
+        available_key = tuple(available_stores)
+        base = self._base_priority_cache.get(available_key)
+        if base is None:
+            available_set = frozenset(available_stores)
+            base = self._base_priority_cache[available_key] = (
+                [s for s in self.config.store_priority if s in available_set],
+                [s for s in self.config.store_priority if s in available_set and s in self._active_store_set],
+            )
+        full_priority, fallback_priority = base
 
         if not self.sales_data:
             return fallback_priority, False, full_priority
@@ -79,22 +194,22 @@ class StockDistributor:
         priority, found = self.sales_data.get_product_priority(
             product_code,
             self.config.store_priority,
-            self._store_id_map
+            self._store_id_map,
+            self._priority_rank
         )
 
         if not found:
             return fallback_priority, True, full_priority
 
-        active_priority = [s for s in priority if s in available_stores and s in self.config.active_stores]
-        full_priority_sales = [s for s in priority if s in available_stores]
+        available_set = frozenset(available_stores)
+        active_priority = [s for s in priority if s in available_set and s in self._active_store_set]
+        full_priority_sales = [s for s in priority if s in available_set]
 
-        for store in fallback_priority:
-            if store not in active_priority:
-                active_priority.append(store)
+        seen_active = set(active_priority)
+        active_priority.extend(s for s in fallback_priority if s not in seen_active)
 
-        for store in full_priority:
-            if store not in full_priority_sales:
-                full_priority_sales.append(store)
+        seen_full = set(full_priority_sales)
+        full_priority_sales.extend(s for s in full_priority if s not in seen_full)
 
         return active_priority, False, full_priority_sales
 
@@ -112,37 +227,48 @@ class StockDistributor:
         source_column: str,
         available_stores: list[str],
         header_row: int = 0
-    ) -> dict:
-        """Group rows by product. Each product has a list of size-rows with stock data.
+    ) -> dict[str, ProductBlock]:
+        """Group rows by product into ProductBlocks (one array per field, sheet order).
 
         Rows with an empty Характеристика are treated as product-level summary/total
         rows and skipped — distributing from them would double-count stock.
         """
-        product_data: dict = defaultdict(lambda: {"rows": []})
-
-        for original_idx, row in df.iterrows():
-            product = row[self.config.product_name_column]
-            if pd.isna(product) or product == "":
-                continue
-
-            variant_raw = row.get(self.config.variant_column, "")
-            variant = str(variant_raw).strip() if pd.notna(variant_raw) else ""
-            if variant == "":
-                continue
-
-            product = str(product)
-            source_qty = get_stock_value(row.get(source_column, 0))
-
-            store_quantities = {s: get_stock_value(row.get(s, 0)) for s in available_stores}
-            excel_row = header_row + 3 + original_idx
-
-            product_data[product]["rows"].append({
-                "row_idx": excel_row,
-                "variant": variant,
-                "source_qty": source_qty,
-                "store_quantities": store_quantities,
-                "original_idx": original_idx,
-            })
+        product_data: dict[str, ProductBlock] = {}
+
+        # Rows without a variant column are all summary rows — nothing to group
+        if self.config.variant_column not in df.columns:
+            return product_data
+
+        # Vectorized row validation: non-empty product and non-empty variant
+        product_series = df[self.config.product_name_column]
+        variant_series = df[self.config.variant_column]
+        variant_strs = variant_series.where(variant_series.notna(), "").astype(str).str.strip()
+        valid = (product_series.notna() & (product_series != "") & (variant_strs != "")).to_numpy()
+
+        # Coerce source and store columns to ints in one pass (source is column 0)
+        if source_column in df.columns:
+            stock = get_stock_matrix(df, [source_column, *available_stores])[valid]
+            source_values, store_matrix = stock[:, 0], stock[:, 1:]
+        else:
+            store_matrix = get_stock_matrix(df, available_stores)[valid]
+            source_values = np.zeros(len(store_matrix), dtype=np.int64)
+
+        product_names = product_series[valid].astype(str).to_numpy()
+        variant_names = variant_strs[valid].to_numpy()
+        original_indices = df.index[valid].to_numpy(dtype=np.int64)
+
+        # Group row positions by product (first-appearance order, rows in sheet order)
+        groups = group_row_positions(product_names)
+        for product, positions in groups.items():
+            original_idx = original_indices[positions]
+            product_data[sys.intern(product)] = ProductBlock(
+                variants=variant_names[positions].tolist(),
+                positions=positions,
+                excel_rows=header_row + 3 + original_idx,
+                original_idx=original_idx,
+                source_qty=source_values[positions],
+                store_qty=store_matrix[positions],
+            )
 
         return product_data
 
@@ -151,191 +277,155 @@ class StockDistributor:
         source_column = self._get_source_column(source)
         source_name = self._get_source_name(source)
 
-        df_filtered = df[df[self.config.product_name_column].notna()].copy()
-        df_filtered = df_filtered[df_filtered[self.config.product_name_column] != ""]
+        # No pre-filtered frame: _analyze_product_inventory's validity mask
+        # already drops rows with an empty product, and boolean .loc would
+        # copy every column of the sheet just to drop them
+        available_stores = [s for s in self.config.store_priority if s in df.columns]
+        product_data = self._analyze_product_inventory(df, source_column, available_stores, header_row)
 
-        available_stores = [s for s in self.config.store_priority if s in df_filtered.columns]
-        product_data = self._analyze_product_inventory(df_filtered, source_column, available_stores, header_row)
+        # One preview per valid row, at the row's position (sheet order)
+        n_rows = sum(len(block) for block in product_data.values())
+        previews_list: list[Optional[TransferPreview]] = [None] * n_rows
 
-        # Working state: per-row remaining stock and live store quantities
-        remaining_stock: dict[int, int] = {}
-        current_store_qty: dict[int, dict[str, int]] = {}
-        for data in product_data.values():
-            for row_data in data["rows"]:
-                idx = row_data["original_idx"]
-                remaining_stock[idx] = row_data["source_qty"]
-                current_store_qty[idx] = dict(row_data["store_quantities"])
-
-        previews_dict: dict[int, TransferPreview] = {}
-        products_using_fallback: set[str] = set()
-        products_filtered_out: set[str] = set()
-        skipped_stores_per_row: dict[int, list[SkippedStore]] = defaultdict(list)
-        target_not_reached_rows: set[int] = set()
-
-        excluded_stores = set(self.config.excluded_stores)
+        excluded_stores = self._excluded_store_set
         target = self.config.target_sizes_filled
         units = self.config.units_per_size
         size_min = self.config.min_product_sizes
         size_max = self.config.max_product_sizes
-
-        def get_or_create_preview(row_data: dict, product_name: str) -> TransferPreview:
-            idx = row_data["original_idx"]
-            if idx not in previews_dict:
-                previews_dict[idx] = TransferPreview(
-                    row_index=row_data["row_idx"],
-                    product_name=product_name,
-                    variant=row_data["variant"],
-                )
-            return previews_dict[idx]
-
-        def count_filled_sizes(product_rows: list[dict], store: str) -> int:
-            return sum(1 for r in product_rows if current_store_qty[r["original_idx"]].get(store, 0) > 0)
-
-        for product, data in product_data.items():
-            rows = data["rows"]
-            total_sizes = len(rows)
+        store_to_col = {store: col for col, store in enumerate(available_stores)}
+        filtered_out_reason = f"Товар не в диапазоне размеров ({size_min}–{size_max})"
+        # Every planned transfer is 1 unit from the source, so there is one
+        # shared (immutable) Transfer per receiving store column
+        unit_transfers = [
+            Transfer(sender=source_name, receiver=store, quantity=1) for store in available_stores
+        ]
+        # Skip entries always carry existing_qty=0, so they are shared per store column too
+        excluded_skips = [
+            SkippedStore(store_name=store, reason="excluded", existing_qty=0) for store in available_stores
+        ]
+        target_skips = [
+            SkippedStore(store_name=store, reason="target_not_reached", existing_qty=0)
+            for store in available_stores
+        ]
+
+        for product, block in product_data.items():
+            # Every row gets a preview, so create them up front (no get-or-create)
+            row_previews = [
+                TransferPreview(row_index=excel_row, product_name=product, variant=variant)
+                for excel_row, variant in zip(block.excel_rows.tolist(), block.variants)
+            ]
+            for pos, row_preview in zip(block.positions.tolist(), row_previews):
+                previews_list[pos] = row_preview
+
+            total_sizes = len(block)
 
             # Range filter on product size count
             if total_sizes < size_min or total_sizes > size_max:
-                products_filtered_out.add(product)
+                for row_preview in row_previews:
+                    row_preview.skip_reason = filtered_out_reason
                 continue
 
             active_priority, uses_fallback, full_priority = self._get_product_priority(product, available_stores)
             if uses_fallback and self.sales_data:
-                products_using_fallback.add(product)
-
-            # Track excluded stores (in priority order, for transparency)
-            for store in full_priority:
-                if store in excluded_stores:
-                    for row_data in rows:
-                        idx = row_data["original_idx"]
-                        if current_store_qty[idx].get(store, 0) == 0:
-                            skipped_stores_per_row[idx].append(SkippedStore(
-                                store_name=store, reason="excluded", existing_qty=0
-                            ))
-
-            # ===== Phase 1: Reach size-count target =====
-            for store in active_priority:
-                if store in excluded_stores:
-                    continue
-
-                current_filled = count_filled_sizes(rows, store)
-                if current_filled >= target:
-                    continue  # Target already met — Phase 1 does nothing
-
-                transferable = [
-                    r for r in rows
-                    if current_store_qty[r["original_idx"]].get(store, 0) == 0
-                    and remaining_stock[r["original_idx"]] > 0
-                ]
-
-                if current_filled + len(transferable) < target:
-                    # All-or-nothing: skip store
-                    for row_data in rows:
-                        idx = row_data["original_idx"]
-                        if current_store_qty[idx].get(store, 0) == 0:
-                            skipped_stores_per_row[idx].append(SkippedStore(
-                                store_name=store, reason="target_not_reached", existing_qty=0
-                            ))
-                            target_not_reached_rows.add(idx)
-                    continue
-
-                # Eligible — transfer 1 unit to each transferable size
-                for row_data in transferable:
-                    idx = row_data["original_idx"]
-                    preview = get_or_create_preview(row_data, product)
-                    preview.transfers.append(Transfer(
-                        sender=source_name, receiver=store, quantity=1
-                    ))
-                    remaining_stock[idx] -= 1
-                    current_store_qty[idx][store] = current_store_qty[idx].get(store, 0) + 1
-
-            # ===== Phase 2: Top up to 2 units per size =====
-            if units >= 2:
-                for store in active_priority:
-                    if store in excluded_stores:
-                        continue
-                    for row_data in rows:
-                        idx = row_data["original_idx"]
-                        if current_store_qty[idx].get(store, 0) == 1 and remaining_stock[idx] > 0:
-                            preview = get_or_create_preview(row_data, product)
-                            preview.transfers.append(Transfer(
-                                sender=source_name, receiver=store, quantity=1
-                            ))
-                            remaining_stock[idx] -= 1
-                            current_store_qty[idx][store] += 1
-
-            # ===== Phase 3: Top up to 3 units per size =====
-            if units >= 3:
-                for store in active_priority:
-                    if store in excluded_stores:
-                        continue
-                    for row_data in rows:
-                        idx = row_data["original_idx"]
-                        if current_store_qty[idx].get(store, 0) == 2 and remaining_stock[idx] > 0:
-                            preview = get_or_create_preview(row_data, product)
-                            preview.transfers.append(Transfer(
-                                sender=source_name, receiver=store, quantity=1
-                            ))
-                            remaining_stock[idx] -= 1
-                            current_store_qty[idx][store] += 1
-
-        # Create empty previews for rows without transfers
-        for product, data in product_data.items():
-            for row_data in data["rows"]:
-                idx = row_data["original_idx"]
-                if idx not in previews_dict:
-                    previews_dict[idx] = TransferPreview(
-                        row_index=row_data["row_idx"],
-                        product_name=product,
-                        variant=row_data["variant"],
-                    )
-
-        # Set per-row status flags
-        for idx, preview in previews_dict.items():
-            if preview.product_name in products_using_fallback:
-                preview.uses_fallback_priority = True
-            if idx in target_not_reached_rows:
-                preview.target_not_reached = True
-            if idx in skipped_stores_per_row:
-                preview.skipped_stores = skipped_stores_per_row[idx]
-            if preview.product_name in products_filtered_out:
-                preview.skip_reason = (
-                    f"Товар не в диапазоне размеров ({size_min}–{size_max})"
-                )
-
-        return sorted(previews_dict.values(), key=lambda p: p.row_index)
-
-    def execute(self, df: pd.DataFrame, source: str = "stock", header_row: int = 0) -> list[TransferResult]:
-        """Execute distribution and return transfer results grouped by receiver."""
-        source_name = self._get_source_name(source)
-        previews = self.preview(df, source, header_row)
+                for row_preview in row_previews:
+                    row_preview.uses_fallback_priority = True
+
+            # Working state for this product: live store quantities (rows x
+            # available_stores) and remaining source stock per row, indexed by
+            # position within the block. Products never share rows, so state is
+            # independent per product. The block arrays are fresh per preview
+            # call, so they are updated in place rather than copied.
+            qty = block.store_qty
+            remaining = block.source_qty
+
+            # Track excluded stores (in priority order, for transparency): one
+            # mask over all excluded columns, read row by row in priority order
+            excluded_cols = [store_to_col[s] for s in full_priority if s in excluded_stores]
+            if excluded_cols:
+                for i, k in np.argwhere(qty[:, excluded_cols] == 0).tolist():
+                    row_previews[i].skipped_stores.append(excluded_skips[excluded_cols[k]])
+
+            stores = [s for s in active_priority if s not in excluded_stores]
+            cols = np.array([store_to_col[s] for s in stores], dtype=np.intp)
+
+            # Plan all phases on arrays, then emit transfers/skips from the masks
+            skip, allocations = _plan_product_transfers(qty, remaining, cols, target, units)
+
+            if skip.any():
+                col_list = cols.tolist()
+                for i, k in np.argwhere(skip).tolist():
+                    row_previews[i].skipped_stores.append(target_skips[col_list[k]])
+                    row_previews[i].target_not_reached = True
+            # Flatten all phases into parallel (row, store) arrays: side by side
+            # the masks read row-major as phase then priority order, which is
+            # the order transfers are listed in. Each row's list is built once.
+            transfer_rows, transfer_cols = np.nonzero(np.concatenate(allocations, axis=1))
+            if transfer_rows.size:
+                transfers = [unit_transfers[c] for c in cols[transfer_cols % len(stores)].tolist()]
+                starts = np.flatnonzero(np.diff(transfer_rows, prepend=-1)).tolist()
+                ends = starts[1:] + [len(transfers)]
+                for i, start, end in zip(transfer_rows[starts].tolist(), starts, ends):
+                    row_previews[i].transfers = transfers[start:end]
+
+        return sorted(previews_list, key=lambda p: p.row_index)
+
+    def execute(
+        self,
+        df: pd.DataFrame,
+        source: str = "stock",
+        header_row: int = 0,
+        previews: Optional[list[TransferPreview]] = None
+    ) -> list[TransferResult]:
+        """Execute distribution and return transfer results grouped by receiver.
 
-        transfers_grouped: dict[tuple[str, str], list[tuple[str, str, int]]] = {}
+        Pass ``previews`` from a preview() call on the same df/source to skip
+        recomputing the distribution.
+        """
+        source_name = self._get_source_name(source)
+        if previews is None:
+            previews = self.preview(df, source, header_row)
+
+        # Flatten all transfers into columns in one pass (preview fields are
+        # repeated per transfer with one list multiply), then let pandas group
+        senders: list[str] = []
+        receivers: list[str] = []
+        quantities: list[int] = []
+        products: list[str] = []
+        variants: list[str] = []
         for preview in previews:
-            for transfer in preview.transfers:
-                key = (transfer.sender, transfer.receiver)
-                transfers_grouped.setdefault(key, []).append((
-                    preview.product_name, preview.variant, transfer.quantity
-                ))
-
+            transfers = preview.transfers
+            if not transfers:
+                continue
+            products += [preview.product_name] * len(transfers)
+            variants += [preview.variant] * len(transfers)
+            for transfer in transfers:
+                senders.append(transfer.sender)
+                receivers.append(transfer.receiver)
+                quantities.append(transfer.quantity)
+
+        if not senders:
+            return []
+
+        all_transfers = pd.DataFrame({
+            "sender": senders,
+            "receiver": receivers,
+            "Номенклатура": products,
+            "Характеристика": variants,
+            "Количество": np.array(quantities, dtype=np.int64),
+        })
+
+        store_codes = self._store_code_cache
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         results = []
 
-        for (sender, receiver), items in transfers_grouped.items():
-            receiver_code = receiver.split()[0] if receiver != source_name else "Сток"
-
-            output_df = pd.DataFrame({
-                "Артикул": [""] * len(items),
-                "Код номенклатуры": [""] * len(items),
-                "Номенклатура": [item[0] for item in items],
-                "Характеристика": [item[1] for item in items],
-                "Назначение": [""] * len(items),
-                "Серия": [""] * len(items),
-                "Код упаковки": [""] * len(items),
-                "Упаковка": [""] * len(items),
-                "Количество": [item[2] for item in items],
-            })
+        # Group on the full store name (two stores may share a code); the code
+        # is only used for the result's receiver and filename.
+        # sort=False: groups in first-appearance order, rows in preview order
+        for (sender, receiver), group in all_transfers.groupby(["sender", "receiver"], sort=False):
+            receiver_code = store_codes.get(receiver) or receiver.split()[0]
+            # reindex drops the key columns and adds the empty placeholder
+            # columns in OUTPUT_COLUMNS order
+            output_df = group.reset_index(drop=True).reindex(columns=OUTPUT_COLUMNS, fill_value="")
 
             filename = f"{source_name}_to_{receiver_code}_{timestamp}.xlsx"
             results.append(TransferResult(
@@ -349,12 +439,18 @@ class StockDistributor:
         original_file: BinaryIO,
         df: pd.DataFrame,
         source: str = "stock",
-        header_row: int = 0
+        header_row: int = 0,
+        previews: Optional[list[TransferPreview]] = None
     ) -> UpdatedInventoryResult:
-        """Generate updated inventory Excel with stock decrements and store additions applied."""
+        """Generate updated inventory Excel with stock decrements and store additions applied.
+
+        Pass ``previews`` from a preview() call on the same df/source to skip
+        recomputing the distribution.
+        """
         from .inventory_updater import generate_updated_inventory_result
 
-        previews = self.preview(df, source, header_row)
+        if previews is None:
+            previews = self.preview(df, source, header_row)
         source_column = self._get_source_column(source)
         source_name = self._get_source_name(source)
 
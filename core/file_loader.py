@@ -7,7 +7,56 @@ It is UI-agnostic and can be used by both Streamlit and CLI applications.
 import pandas as pd
 from typing import BinaryIO
 
-from .config import PRODUCT_NAME_COLUMN
+from .config import EXCEL_ENGINE, PRODUCT_NAME_COLUMN
+
+
+def _find_header_index(rows: pd.DataFrame) -> int | None:
+    """Return the index of the first row containing PRODUCT_NAME_COLUMN, if any."""
+    for idx, row in zip(rows.index, rows.itertuples(index=False, name=None)):
+        row_values = [str(v) for v in row if pd.notna(v)]
+        if PRODUCT_NAME_COLUMN in row_values:
+            return int(idx)
+    return None
+
+
+def _column_names(header: pd.Series) -> list:
+    """Column names as read_excel(header=...) gives them: blanks become
+    "Unnamed: i", repeated names get ".1", ".2", ... suffixes."""
+    names = [
+        f"Unnamed: {i}" if pd.isna(name) else name
+        for i, name in enumerate(header.tolist())
+    ]
+    counts: dict = {}
+    for i, name in enumerate(names):
+        count = counts.get(name, 0)
+        base = name
+        while count:
+            counts[base] = count + 1
+            name = f"{base}.{count}"
+            # Skip suffixes that some other header already uses as is
+            count = count + 1 if name in names else counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+
+def _restore_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Infer column dtypes once the header rows are sliced off: columns whose
+    values are all numbers (or numeric text) become numeric, as with
+    read_excel(header=...)."""
+    if df.empty:
+        return df
+    df = df.infer_objects()
+    for column in df.columns[df.dtypes == object]:
+        values = df[column]
+        numeric = pd.to_numeric(values, errors="coerce")
+        if numeric.notna().sum() == values.notna().sum():
+            df[column] = numeric
+    return df
+
+
+def _header_not_found_error(max_rows: int) -> str:
+    return f"Строка заголовка с '{PRODUCT_NAME_COLUMN}' не найдена в первых {max_rows} строках"
 
 
 def find_header_row(file: BinaryIO, max_rows: int = 20) -> tuple[int | None, str | None]:
@@ -24,19 +73,16 @@ def find_header_row(file: BinaryIO, max_rows: int = 20) -> tuple[int | None, str
     """
     try:
         # Read first max_rows without header
-        preview_df = pd.read_excel(file, header=None, nrows=max_rows)
+        preview_df = pd.read_excel(file, header=None, nrows=max_rows, engine=EXCEL_ENGINE)
 
         # Search for the row containing the product name column
-        for idx, row in preview_df.iterrows():
-            row_values = [str(v) for v in row.values if pd.notna(v)]
-            if PRODUCT_NAME_COLUMN in row_values:
-                # Reset file pointer for subsequent reads
-                file.seek(0)
-                return int(idx), None
-
-        # Not found
+        header_row = _find_header_index(preview_df)
+
+        # Reset file pointer for subsequent reads
         file.seek(0)
-        return None, f"Строка заголовка с '{PRODUCT_NAME_COLUMN}' не найдена в первых {max_rows} строках"
+        if header_row is None:
+            return None, _header_not_found_error(max_rows)
+        return header_row, None
 
     except Exception as e:
         file.seek(0)
@@ -50,9 +96,14 @@ def load_excel_with_header(
     """Load Excel file with automatic header detection.
 
     This function:
-    1. Finds the header row by searching for PRODUCT_NAME_COLUMN
-    2. Loads the Excel with that header row
-    3. Skips the sub-header row (contains "Остаток на складе")
+    1. Reads the sheet once without a header
+    2. Finds the header row by searching for PRODUCT_NAME_COLUMN
+    3. Takes the rows below the sub-header row (contains "Остаток на складе")
+       with the header row as column names and converts numeric columns
+
+    The result matches find_header_row() followed by
+    pd.read_excel(header=..., skiprows=[header + 1]) for the number, text and
+    date cells stock files hold, without reading the workbook twice.
 
     Args:
         file: File-like object (uploaded file or opened file)
@@ -63,19 +114,23 @@ def load_excel_with_header(
         If successful: (df, header_row, None)
         If error: (None, None, error_message)
     """
-    header_row, error = find_header_row(file, max_header_search_rows)
-    
-    if error:
-        return None, None, error
-    
     try:
-        # Skip the sub-header row (contains "Остаток на складе") right after header
-        df = pd.read_excel(file, header=header_row, skiprows=[header_row + 1])
-        file.seek(0)
-        return df, header_row, None
+        raw = pd.read_excel(file, header=None, engine=EXCEL_ENGINE)
     except Exception as e:
         file.seek(0)
         return None, None, f"Ошибка чтения файла: {e}"
+    file.seek(0)
+
+    header_row = _find_header_index(raw.iloc[:max_header_search_rows])
+    if header_row is None:
+        return None, None, _header_not_found_error(max_header_search_rows)
+
+    try:
+        df = raw.iloc[header_row + 2:].reset_index(drop=True)
+        df.columns = _column_names(raw.iloc[header_row])
+        return _restore_dtypes(df), header_row, None
+    except Exception as e:
+        return None, None, f"Ошибка чтения файла: {e}"
 
 
 def validate_required_columns(
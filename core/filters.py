@@ -4,6 +4,7 @@ This module provides functions for filtering DataFrame rows based on various cri
 It is UI-agnostic and can be used by both Streamlit and CLI applications.
 """
 
+import numpy as np
 import pandas as pd
 
 from .config import (
@@ -49,11 +50,47 @@ def extract_article_name(nomenclature) -> str:
     return parts[0].strip()
 
 
-def get_unique_article_types(df: pd.DataFrame) -> list[str]:
+def extract_article_names(nomenclatures: pd.Series) -> pd.Series:
+    """Vectorized extract_article_name over a whole Номенклатура column.
+
+    Args:
+        nomenclatures: Values from Номенклатура column
+
+    Returns:
+        Series of article names aligned with the input ("" for missing values)
+    """
+    names = nomenclatures.astype(str).str.split("_", n=1).str[0].str.strip()
+    return names.where(nomenclatures.notna(), "")
+
+
+def format_filter_values(values: pd.Series) -> pd.Series:
+    """Vectorized format_filter_value over a whole column.
+
+    Each distinct value is formatted once and mapped back by its factorized
+    code, so a long column with few distinct values costs a handful of calls.
+
+    Args:
+        values: Column values to format
+
+    Returns:
+        Series of formatted strings aligned with the input
+    """
+    codes, uniques = pd.factorize(values)
+    # Code -1 (missing value) picks the trailing "" entry
+    formatted = np.array([format_filter_value(v) for v in uniques] + [""], dtype=object)
+    return pd.Series(formatted[codes], index=values.index)
+
+
+def get_unique_article_types(
+    df: pd.DataFrame,
+    article_names: pd.Series | None = None
+) -> list[str]:
     """Extract unique article types from DataFrame.
 
     Args:
         df: DataFrame with PRODUCT_NAME_COLUMN
+        article_names: Optional precomputed extract_article_names of
+            PRODUCT_NAME_COLUMN (computed here when omitted)
         
     Returns:
         Sorted list of unique article types (non-empty)
@@ -61,7 +98,9 @@ def get_unique_article_types(df: pd.DataFrame) -> list[str]:
     if PRODUCT_NAME_COLUMN not in df.columns:
         return []
     
-    article_types = df[PRODUCT_NAME_COLUMN].apply(extract_article_name).unique().tolist()
+    if article_names is None:
+        article_names = extract_article_names(df[PRODUCT_NAME_COLUMN])
+    article_types = article_names.unique().tolist()
     article_types = [v for v in article_types if v.strip()]
     article_types.sort()
     return article_types
@@ -107,13 +146,16 @@ def get_unique_additional_names(df: pd.DataFrame) -> list[str]:
 
 def apply_article_type_filter(
     df: pd.DataFrame,
-    selected_types: list[str]
+    selected_types: list[str],
+    article_names: pd.Series | None = None
 ) -> pd.DataFrame:
     """Filter DataFrame by article types.
 
     Args:
         df: Input DataFrame
         selected_types: List of article types to include
+        article_names: Optional precomputed extract_article_names of
+            PRODUCT_NAME_COLUMN, aligned with df
         
     Returns:
         Filtered DataFrame
@@ -121,25 +163,31 @@ def apply_article_type_filter(
     if not selected_types:
         return df
     
+    if article_names is None:
+        article_names = extract_article_names(df[PRODUCT_NAME_COLUMN])
+    
     # Get all unique types to check if all are selected
-    all_types = set(get_unique_article_types(df))
+    all_types = set(get_unique_article_types(df, article_names))
     
     if set(selected_types) == all_types:
         # All types selected - no filtering needed
         return df
     
-    return df[df[PRODUCT_NAME_COLUMN].apply(extract_article_name).isin(selected_types)]
+    return df[article_names.isin(selected_types)]
 
 
 def apply_collection_filter(
     df: pd.DataFrame,
-    selected_collections: list[str]
+    selected_collections: list[str],
+    formatted: pd.Series | None = None
 ) -> pd.DataFrame:
     """Filter DataFrame by collections.
 
     Args:
         df: Input DataFrame
         selected_collections: List of collections to include
+        formatted: Optional precomputed format_filter_values of
+            COLLECTION_COLUMN, aligned with df
         
     Returns:
         Filtered DataFrame
@@ -147,18 +195,23 @@ def apply_collection_filter(
     if not selected_collections or COLLECTION_COLUMN not in df.columns:
         return df
     
-    return df[df[COLLECTION_COLUMN].apply(format_filter_value).isin(selected_collections)]
+    if formatted is None:
+        formatted = format_filter_values(df[COLLECTION_COLUMN])
+    return df[formatted.isin(selected_collections)]
 
 
 def apply_additional_name_filter(
     df: pd.DataFrame,
-    selected_names: list[str]
+    selected_names: list[str],
+    formatted: pd.Series | None = None
 ) -> pd.DataFrame:
     """Filter DataFrame by additional names.
 
     Args:
         df: Input DataFrame
         selected_names: List of additional names to include
+        formatted: Optional precomputed format_filter_values of
+            ADDITIONAL_NAME_COLUMN, aligned with df
         
     Returns:
         Filtered DataFrame
@@ -166,7 +219,9 @@ def apply_additional_name_filter(
     if not selected_names or ADDITIONAL_NAME_COLUMN not in df.columns:
         return df
     
-    return df[df[ADDITIONAL_NAME_COLUMN].apply(format_filter_value).isin(selected_names)]
+    if formatted is None:
+        formatted = format_filter_values(df[ADDITIONAL_NAME_COLUMN])
+    return df[formatted.isin(selected_names)]
 
 
 def apply_all_filters(
@@ -1,13 +1,59 @@
 """Inventory update logic - generates updated Excel with post-distribution quantities."""
 
 import io
-from typing import BinaryIO
+import sys
+from typing import BinaryIO, Optional
 
 from openpyxl import load_workbook
 
 from .models import TransferPreview, UpdatedInventoryResult
 
 
+def _cell_int(value) -> int:
+    """Cell value as int; empty and non-numeric cells count as 0."""
+    # Plain ints are the common case in stock columns - skip the float round-trip
+    if type(value) is int:
+        return value
+    if not value:
+        return 0
+    try:
+        return int(float(value))
+    except (ValueError, TypeError):
+        return 0
+
+
+def _read_header_columns(file: BinaryIO, excel_header_row: int) -> dict[str, int]:
+    """
+    Map header names to 1-indexed column numbers.
+
+    Uses a read-only workbook so only the rows up to the header are parsed,
+    instead of materializing every cell of the sheet.
+    """
+    file.seek(0)
+    wb = load_workbook(file, read_only=True)
+    try:
+        ws = wb.active
+        # Read-only sheets trust the stored <dimension>, which some exporters
+        # write stale (e.g. "A1"); reset it so the header row is read in full
+        ws.reset_dimensions()
+        header_values = next(
+            ws.iter_rows(
+                min_row=excel_header_row,
+                max_row=excel_header_row,
+                values_only=True,
+            ),
+            (),
+        )
+    finally:
+        wb.close()
+
+    column_map: dict[str, int] = {}
+    for col_idx, cell_value in enumerate(header_values, start=1):
+        if cell_value:
+            column_map[sys.intern(str(cell_value).strip())] = col_idx
+    return column_map
+
+
 def apply_transfers_to_inventory(
     original_file: BinaryIO,
     previews: list[TransferPreview],
@@ -28,29 +74,50 @@ def apply_transfers_to_inventory(
     """
     warnings: list[str] = []
 
-    # Load workbook preserving formatting
-    original_file.seek(0)
-    wb = load_workbook(original_file)
-    ws = wb.active
-
-    # Find column indices from header row (1-indexed in openpyxl)
+    # Header lookup streams a single row in read-only mode
     excel_header_row = header_row + 1  # Convert to 1-indexed
-    column_map: dict[str, int] = {}
-
-    for col_idx in range(1, ws.max_column + 1):
-        cell_value = ws.cell(row=excel_header_row, column=col_idx).value
-        if cell_value:
-            column_map[str(cell_value).strip()] = col_idx
+    column_map = _read_header_columns(original_file, excel_header_row)
 
     # Find source column index
     source_col_idx = column_map.get(source_column)
     if not source_col_idx:
         warnings.append(f"Столбец источника '{source_column}' не найден")
-        output = io.BytesIO()
-        wb.save(output)
-        return output.getvalue(), warnings
+    if not source_col_idx or not any(p.has_transfers for p in previews):
+        # Nothing to edit - the original file is already the result
+        original_file.seek(0)
+        return original_file.read(), warnings
+
+    # Load workbook preserving formatting (only needed for actual edits)
+    original_file.seek(0)
+    wb = load_workbook(original_file)
+    ws = wb.active
 
-    # Process each preview with transfers
+    # Store code (first header token) -> column, first matching header wins
+    prefix_map: dict[str, int] = {}
+    ambiguous_prefixes: set[str] = set()
+    for col_name, col_idx in column_map.items():
+        parts = col_name.split()
+        if parts:
+            if parts[0] in prefix_map:
+                ambiguous_prefixes.add(parts[0])
+            else:
+                prefix_map[parts[0]] = col_idx
+    receiver_cols: dict[str, Optional[int]] = {}
+
+    # (row, col) -> new value; computed first, then written in row-major order
+    patches: dict[tuple[int, int], int] = {}
+    # openpyxl's sparse cell store (openpyxl is pinned); reading it directly
+    # skips ws.cell()'s validation and does not create cells for blanks
+    cells = ws._cells
+
+    def current_value(row: int, col: int) -> int:
+        value = patches.get((row, col))
+        if value is not None:
+            return value
+        cell = cells.get((row, col))
+        return _cell_int(cell.value) if cell is not None else 0
+
+    # Compute the new source/receiver values for each preview with transfers
     for preview in previews:
         if not preview.has_transfers:
             continue
@@ -61,12 +128,7 @@ def apply_transfers_to_inventory(
         total_from_source = sum(t.quantity for t in preview.transfers)
 
         # Update source column (reduce)
-        source_cell = ws.cell(row=excel_row, column=source_col_idx)
-        original_value = source_cell.value if source_cell.value else 0
-        try:
-            original_value = int(float(original_value))
-        except (ValueError, TypeError):
-            original_value = 0
+        original_value = current_value(excel_row, source_col_idx)
 
         new_value = original_value - total_from_source
         if new_value < 0:
@@ -74,33 +136,46 @@ def apply_transfers_to_inventory(
                 f"Строка {excel_row}: Исходное значение ({original_value}) < Перемещение ({total_from_source})"
             )
             new_value = 0
-        source_cell.value = new_value
+        patches[(excel_row, source_col_idx)] = new_value
 
-        # Update receiver columns (increase)
+        # Sum quantities per receiver first, so each receiver cell is updated once
+        per_receiver: dict[str, int] = {}
         for transfer in preview.transfers:
-            receiver = transfer.receiver
+            per_receiver[transfer.receiver] = per_receiver.get(transfer.receiver, 0) + transfer.quantity
 
-            # Find receiver column
-            receiver_col_idx = column_map.get(receiver)
-            if not receiver_col_idx:
-                # Try finding by store code prefix
-                for col_name, col_idx in column_map.items():
-                    if col_name.startswith(receiver.split()[0] if " " in receiver else receiver):
-                        receiver_col_idx = col_idx
-                        break
+        # Update receiver columns (increase)
+        for receiver, quantity in per_receiver.items():
+            # Find receiver column (resolved once per receiver)
+            if receiver in receiver_cols:
+                receiver_col_idx = receiver_cols[receiver]
+            else:
+                receiver_col_idx = column_map.get(receiver)
+                if not receiver_col_idx:
+                    prefix = receiver.partition(" ")[0]
+                    receiver_col_idx = prefix_map.get(prefix)
+                    if prefix in ambiguous_prefixes:
+                        # Reported once per receiver thanks to the memo
+                        warnings.append(
+                            f"Несколько столбцов с кодом '{prefix}' для '{receiver}', "
+                            f"используется столбец {receiver_col_idx}"
+                        )
+                receiver_cols[receiver] = receiver_col_idx
 
             if not receiver_col_idx:
                 warnings.append(f"Строка {excel_row}: Столбец назначения '{receiver}' не найден")
                 continue
 
-            receiver_cell = ws.cell(row=excel_row, column=receiver_col_idx)
-            receiver_value = receiver_cell.value if receiver_cell.value else 0
-            try:
-                receiver_value = int(float(receiver_value))
-            except (ValueError, TypeError):
-                receiver_value = 0
+            patches[(excel_row, receiver_col_idx)] = (
+                current_value(excel_row, receiver_col_idx) + quantity
+            )
 
-            receiver_cell.value = receiver_value + transfer.quantity
+    # Apply all edits in one sorted pass
+    for (row, col), value in sorted(patches.items()):
+        cell = cells.get((row, col))
+        if cell is not None:
+            cell.value = value
+        else:
+            ws.cell(row=row, column=col, value=value)
 
     # Save to bytes
     output = io.BytesIO()
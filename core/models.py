@@ -3,9 +3,16 @@
 from dataclasses import dataclass, field
 from typing import Optional
 import re
+import sys
+import numpy as np
 import pandas as pd
 
 
+# Store row format: 5-7 digit ID (optional leading zeros), whitespace, name
+STORE_ID_PATTERN = r"^0*(\d{5,7})\s+\S"
+_STORE_ID_RE = re.compile(STORE_ID_PATTERN)
+
+
 def extract_store_id(store_name: str) -> Optional[int]:
     """
     Extract numeric store ID from store name.
@@ -19,8 +26,13 @@ def extract_store_id(store_name: str) -> Optional[int]:
     """
     if not store_name:
         return None
+    if not isinstance(store_name, str):
+        store_name = str(store_name)
+    # Store names start with a digit - reject everything else before the regex
+    if not store_name[:1].isdigit():
+        return None
     # Match store format: 5-7 digits (with optional leading zeros) followed by space and name
-    match = re.match(r"^0*(\d{5,7})\s+\S", str(store_name))
+    match = _STORE_ID_RE.match(store_name)
     if match:
         return int(match.group(1))
     return None
@@ -44,12 +56,32 @@ def build_store_id_map(store_names: list[str]) -> dict[int, str]:
     return result
 
 
+def build_priority_rank(store_names: list[str]) -> dict[str, int]:
+    """
+    Build mapping from store name to its position in a priority list.
+
+    Duplicates keep their first position, matching list.index().
+
+    Args:
+        store_names: Priority-ordered store names (e.g. config.store_priority)
+
+    Returns:
+        Dict mapping store name to 0-based rank
+    """
+    rank: dict[str, int] = {}
+    for idx, name in enumerate(store_names):
+        rank.setdefault(name, idx)
+    return rank
+
+
 def get_stock_value(val) -> int:
     """
     Convert cell value to integer, treating NaN/empty as 0.
 
     Used by both StockDistributor and InventoryBalancer.
     """
+    if type(val) is int:
+        return val
     if pd.isna(val) or val == "" or val == "Остаток на складе":
         return 0
     try:
@@ -58,6 +90,65 @@ def get_stock_value(val) -> int:
         return 0
 
 
+# Largest integer magnitude below which every float64 is an exact integer
+_FLOAT_EXACT_INT = float(2 ** 53)
+
+
+def get_stock_matrix(df: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    """
+    Convert stock columns to an integer matrix in one vectorized pass.
+
+    Same semantics as get_stock_value applied per cell: NaN, empty strings,
+    the "Остаток на складе" sub-header, dates and other non-numeric values
+    become 0, fractional values are truncated. Values beyond the integers
+    a float64 holds exactly (including infinity) are clipped to that range
+    rather than wrapping around.
+
+    Returns:
+        int64 array of shape (len(df), len(columns))
+    """
+    if not columns:
+        return np.zeros((len(df), 0), dtype=np.int64)
+    block = df[columns]
+    # Columns read from Excel as numbers need no parsing. Everything else
+    # (text, sub-headers, datetime/timedelta columns) goes through to_numeric
+    # on plain objects, where dates and other non-numbers coerce to NaN
+    # (to_numeric on a datetime64 column would return nanoseconds instead)
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in block.dtypes):
+        block = block.apply(
+            lambda col: col if pd.api.types.is_numeric_dtype(col.dtype)
+            else pd.to_numeric(col.astype(object, copy=False), errors="coerce")
+        )
+    values = np.trunc(block.fillna(0).to_numpy(dtype=np.float64))
+    np.clip(values, -_FLOAT_EXACT_INT, _FLOAT_EXACT_INT, out=values)
+    return values.astype(np.int64)
+
+
+def group_row_positions(names: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Group row positions by name, keeping first-appearance order of names and
+    sheet order of rows within each group.
+
+    Names are factorized to int codes once, so grouping is a stable argsort
+    over ints instead of hashing every string in a groupby.
+
+    Returns:
+        Dict of name -> int array of row positions
+    """
+    codes, uniques = pd.factorize(names)
+    if len(codes) == 0:
+        return {}
+    order = np.argsort(codes, kind="stable")
+    # Each product is a contiguous run of the sorted order; slicing the runs
+    # directly avoids np.split's per-piece overhead
+    ends = np.cumsum(np.bincount(codes)).tolist()
+    starts = [0] + ends[:-1]
+    return {
+        name: order[start:end]
+        for name, start, end in zip(uniques.tolist(), starts, ends)
+    }
+
+
 def count_sizes_with_stock(product_rows: list[dict], store: str) -> int:
     """
     Count how many different sizes a store has for a product (qty > 0).
@@ -78,7 +169,7 @@ def count_sizes_with_stock(product_rows: list[dict], store: str) -> int:
 
 
 
-@dataclass
+@dataclass(slots=True)
 class StoreSales:
     """Sales data for a single store for a specific product."""
     store_id: int          # Numeric ID (e.g., 130143)
@@ -86,7 +177,7 @@ class StoreSales:
     quantity: int          # Sales quantity
 
 
-@dataclass
+@dataclass(slots=True)
 class ProductSalesData:
     """Sales data for a single product across all stores."""
     product_code: str      # e.g., "C5 21354.2110/1010"
@@ -97,7 +188,8 @@ class ProductSalesData:
     def get_priority_order(
         self,
         fallback_priority: list[str],
-        store_id_map: dict[int, str]
+        store_id_map: dict[int, str],
+        fallback_rank: Optional[dict[str, int]] = None
     ) -> list[str]:
         """
         Get store names ordered by sales (descending).
@@ -106,31 +198,27 @@ class ProductSalesData:
         Args:
             fallback_priority: User-configured static priority list
             store_id_map: Mapping from store_id (int) to full store name
+            fallback_rank: Optional precomputed build_priority_rank(fallback_priority)
 
         Returns:
             List of store names in priority order (highest sales first)
         """
-        def sort_key(store_sale: StoreSales) -> tuple:
-            # Get the canonical store name from our map
-            store_name = store_id_map.get(store_sale.store_id, "")
-            # Find position in fallback priority (for tiebreaker)
-            fallback_idx = (
-                fallback_priority.index(store_name)
-                if store_name in fallback_priority
-                else len(fallback_priority)
-            )
-            # Sort by: sales descending (-quantity), then fallback position ascending
-            return (-store_sale.quantity, fallback_idx)
-
-        sorted_sales = sorted(self.store_sales, key=sort_key)
-
-        # Return store names from our canonical map
-        result = []
-        for s in sorted_sales:
-            store_name = store_id_map.get(s.store_id)
+        if fallback_rank is None:
+            fallback_rank = build_priority_rank(fallback_priority)
+        unranked = len(fallback_priority)
+
+        # Decorate once with (sales descending, fallback position, sheet order,
+        # canonical name); stores missing from our map are dropped up front.
+        # Plain tuple sort, no key function; the index keeps it stable.
+        decorated = []
+        for idx, store_sale in enumerate(self.store_sales):
+            store_name = store_id_map.get(store_sale.store_id)
             if store_name:
-                result.append(store_name)
-        return result
+                decorated.append(
+                    (-store_sale.quantity, fallback_rank.get(store_name, unranked), idx, store_name)
+                )
+        decorated.sort()
+        return [entry[3] for entry in decorated]
 
 
 @dataclass
@@ -142,7 +230,8 @@ class SalesPriorityData:
         self,
         product_code: str,
         fallback_priority: list[str],
-        store_id_map: dict[int, str]
+        store_id_map: dict[int, str],
+        fallback_rank: Optional[dict[str, int]] = None
     ) -> tuple[list[str], bool]:
         """
         Get store priority for a specific product.
@@ -151,6 +240,8 @@ class SalesPriorityData:
             product_code: Extracted product code
             fallback_priority: User-configured static priority
             store_id_map: Mapping from store_id to full store name
+            fallback_rank: Optional precomputed build_priority_rank(fallback_priority),
+                so callers looking up many products build it only once
 
         Returns:
             Tuple of (priority_list, was_found_in_sales_data)
@@ -159,7 +250,7 @@ class SalesPriorityData:
         """
         if product_code in self.products:
             priority = self.products[product_code].get_priority_order(
-                fallback_priority, store_id_map
+                fallback_priority, store_id_map, fallback_rank
             )
             # If sales data exists but resulted in empty list, use fallback
             if priority:
@@ -167,23 +258,23 @@ class SalesPriorityData:
         return fallback_priority, False
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Transfer:
-    """Represents a single transfer between sender and receiver."""
+    """Represents a single transfer between sender and receiver (immutable, shareable)."""
     sender: str
     receiver: str
     quantity: int
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SkippedStore:
-    """Represents a store that was skipped during distribution."""
+    """Represents a store that was skipped during distribution (immutable, shareable)."""
     store_name: str      # Full store name (e.g., "125007 MSK-PC-Гагаринский")
     reason: str          # "has_stock", "target_not_reached", "excluded", "filtered_out"
     existing_qty: int = 0  # Number of existing pieces (for has_stock reason)
 
 
-@dataclass
+@dataclass(slots=True)
 class TransferPreview:
     """Preview of transfers for a single product row."""
     row_index: int
@@ -238,6 +329,24 @@ class TransferResult:
         return len(self.data)
 
 
+@dataclass(slots=True)
+class ProductBlock:
+    """Struct-of-arrays view of one product's size rows (distributor working data).
+
+    Built fresh for each preview; the distributor decrements source_qty and
+    increments store_qty in place as it plans transfers.
+    """
+    variants: list[str]        # Stripped Характеристика per row
+    positions: np.ndarray      # int64, row positions among all valid rows (sheet order)
+    excel_rows: np.ndarray     # int64, 1-based Excel row numbers
+    original_idx: np.ndarray   # int64, DataFrame index labels
+    source_qty: np.ndarray     # int64, source stock per row
+    store_qty: np.ndarray      # int64, (rows, available_stores) store stock
+
+    def __len__(self) -> int:
+        return len(self.variants)
+
+
 @dataclass
 class UpdatedInventoryResult:
     """Result containing updated inventory Excel data."""
@@ -269,10 +378,17 @@ class DistributionConfig:
     product_name_column: str = "Номенклатура"
     variant_column: str = "Характеристика"
 
+    def __post_init__(self) -> None:
+        # Store names are used as dict keys in every hot loop; interning lets
+        # equal names share one object so lookups hit the identity fast path.
+        self.store_priority = [sys.intern(s) for s in self.store_priority]
+        self.excluded_stores = [sys.intern(s) for s in self.excluded_stores]
+
     @property
     def active_stores(self) -> list[str]:
         """Get stores that are not excluded."""
-        return [s for s in self.store_priority if s not in self.excluded_stores]
+        excluded = set(self.excluded_stores)
+        return [s for s in self.store_priority if s not in excluded]
 
     def get_paired_store(self, store_code: str) -> Optional[str]:
         """
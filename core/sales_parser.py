@@ -1,9 +1,12 @@
 """Parser for hierarchical sales Excel files."""
 
+import sys
+import numpy as np
 import pandas as pd
 from typing import Optional
 
-from .models import SalesPriorityData, ProductSalesData, StoreSales, extract_store_id
+from .config import EXCEL_ENGINE
+from .models import SalesPriorityData, ProductSalesData, StoreSales, STORE_ID_PATTERN
 
 
 def extract_product_code_from_sales(name: str) -> Optional[str]:
@@ -89,62 +92,66 @@ def parse_sales_file(file) -> SalesPriorityData:
     Raises:
         ValueError: If file format is invalid
     """
-    # Read without header to process hierarchical structure
-    df = pd.read_excel(file, header=None)
+    # Read without header to process hierarchical structure; only columns 0
+    # and 3 are used (a callable so sheets with fewer columns still load)
+    df = pd.read_excel(
+        file, header=None, engine=EXCEL_ENGINE, usecols=lambda col: col in (0, 3)
+    )
 
     result = SalesPriorityData()
+    if 0 not in df.columns:
+        return result
+
+    # Classify every row with column-wise string ops (no per-row regex)
+    raw_names = df[0]
+    present = raw_names.notna()
+    names = raw_names[present].astype(str).str.strip()
+
+    # Product rows: not starting with a digit, non-empty code after LAST "_"
+    codes = names.str.extract(r"_([^_]*)\Z", expand=False).str.strip()
+    is_product = ~names.str[:1].str.isdigit() & codes.notna() & (codes != "")
+
+    # Store rows: valid store ID format (ID 0 is not a store)
+    store_ids = pd.to_numeric(
+        names.str.extract(STORE_ID_PATTERN, expand=False), errors="coerce"
+    ).fillna(0)
+    is_store = ~is_product & (store_ids > 0)
+
+    # Column 3 quantities; non-numeric values count as 0, floats truncate
+    if 3 in df.columns:
+        quantities = pd.to_numeric(df[3][present], errors="coerce").to_numpy(dtype=float)
+        quantities = np.trunc(np.where(np.isfinite(quantities), quantities, 0)).astype(np.int64)
+    else:
+        quantities = np.zeros(len(names), dtype=np.int64)
+
+    keep = (is_product | is_store).to_numpy(dtype=bool)
     current_product: Optional[ProductSalesData] = None
 
-    # Iterate through rows
-    for idx, row in df.iterrows():
-        cell_value = row.iloc[0] if len(row) > 0 else None  # First column
-        if pd.isna(cell_value):
-            continue
-
-        cell_str = str(cell_value).strip()
-
-        # Skip header rows and empty strings
-        if not cell_str or cell_str in ("Номенклатура", "Склад"):
-            continue
-
-        # Check if this is a product row (starts with "_")
-        product_code = extract_product_code_from_sales(cell_str)
-        if product_code:
+    # Single pass over the already-classified rows to build the hierarchy
+    for cell_str, product_row, product_code, store_id, quantity in zip(
+        names.to_numpy()[keep].tolist(),
+        is_product.to_numpy(dtype=bool)[keep].tolist(),
+        codes.to_numpy()[keep].tolist(),
+        store_ids.to_numpy()[keep].astype(np.int64).tolist(),
+        quantities[keep].tolist(),
+    ):
+        if product_row:
             # Save previous product if exists
             if current_product:
                 result.products[current_product.product_code] = current_product
 
-            # Get total quantity (column 3)
-            quantity = 0
-            if len(row) > 3 and pd.notna(row.iloc[3]):
-                try:
-                    quantity = int(float(row.iloc[3]))
-                except (ValueError, TypeError):
-                    quantity = 0
-
             # Start new product
             current_product = ProductSalesData(
-                product_code=product_code,
+                product_code=sys.intern(product_code),
                 raw_name=cell_str,
                 total_quantity=quantity,
                 store_sales=[]
             )
-            continue
-
-        # Check if this is a store row (starts with digits)
-        store_id = extract_store_id(cell_str)
-        if store_id and current_product:
-            # Get quantity (column 3)
-            quantity = 0
-            if len(row) > 3 and pd.notna(row.iloc[3]):
-                try:
-                    quantity = int(float(row.iloc[3]))
-                except (ValueError, TypeError):
-                    quantity = 0
-
+        elif current_product:
+            # The same store names repeat under every product - keep one copy
             current_product.store_sales.append(StoreSales(
                 store_id=store_id,
-                store_name=cell_str,
+                store_name=sys.intern(cell_str),
                 quantity=quantity
             ))
 
@@ -7,8 +7,9 @@ Balancing Rules (NEW):
 4. Takes from store with highest inventory first
 """
 
+import numpy as np
 import pytest
-from core.balancer import InventoryBalancer
+from core.balancer import InventoryBalancer, _count_sizes_per_store
 from core.models import DistributionConfig
 from tests.conftest import create_test_row, create_test_df, STORE_COLS
 
@@ -658,6 +659,39 @@ class TestBalancerIndicatorFlags:
                 # Reason should be min_sizes
                 assert preview.skipped_stores[0].reason == "min_sizes"
 
+    def test_two_blocked_partners_listed_on_every_blocked_row(self, config_with_pairs):
+        """Partners blocked later in a product are also listed on earlier rows.
+
+        Size S: 125005 sends, partner 125004 blocked. Size M: 125004 sends,
+        partner 125005 blocked. Both rows list both partners; skip_reason
+        names the partner blocked at or before that row.
+        """
+        rows = [
+            create_test_row("Product P", "Size S", store_quantities={
+                "125004 EKT-PC-Гринвич": 0, "125005 EKT-PC-Мега": 5
+            }),
+            create_test_row("Product P", "Size M", store_quantities={
+                "125004 EKT-PC-Гринвич": 5, "125005 EKT-PC-Мега": 0
+            }),
+            create_test_row("Product P", "Size L", store_quantities={}),
+            create_test_row("Product P", "Size XL", store_quantities={}),
+        ]
+        df = create_test_df(rows)
+
+        balancer = InventoryBalancer(config_with_pairs)
+        previews = balancer.preview(df, header_row=7)
+
+        blocked = [p for p in previews if p.has_transfers]
+        assert [p.variant for p in blocked] == ["Size S", "Size M"]
+        for preview in blocked:
+            assert preview.target_not_reached is True
+            assert [(s.store_name, s.reason) for s in preview.skipped_stores] == [
+                ("125004 EKT-PC-Гринвич", "min_sizes"),
+                ("125005 EKT-PC-Мега", "min_sizes"),
+            ]
+        assert "125004" in blocked[0].skip_reason
+        assert "125005" in blocked[1].skip_reason
+
     def test_no_flags_when_transfer_succeeds(self, config_with_pairs):
         """When transfer to partner succeeds, no skip flags should be set."""
         rows = [
@@ -686,3 +720,62 @@ class TestBalancerIndicatorFlags:
             assert len(preview.skipped_stores) == 0
             # Product has 4 sizes, so uses_standard_distribution should be False
             assert preview.uses_standard_distribution is False
+
+
+class TestExecutePreviews:
+    """execute() computes its own preview unless one is passed in."""
+
+    def test_execute_recomputes_for_new_df(self, config):
+        df_a = create_test_df([
+            create_test_row("Product A", "Size M", store_quantities={"125007 MSK-PC-Гагаринский": 5})
+        ])
+        df_b = create_test_df([
+            create_test_row("Product B", "Size L", store_quantities={"130143 MSK-PCM-Мега 2 Химки": 4})
+        ])
+
+        balancer = InventoryBalancer(config)
+        balancer.preview(df_a, header_row=7)
+        results = balancer.execute(df_b, header_row=7)
+
+        assert len(results) == 1
+        assert results[0].sender == "130143"
+        assert results[0].data["Номенклатура"].tolist() == ["Product B"]
+
+    def test_execute_uses_passed_previews(self, config, monkeypatch):
+        df = create_test_df([
+            create_test_row("Product A", "Size M", store_quantities={"125007 MSK-PC-Гагаринский": 5})
+        ])
+        previews = InventoryBalancer(config).preview(df, header_row=7)
+
+        balancer = InventoryBalancer(config)
+        calls = []
+        original = balancer._analyze_products
+        monkeypatch.setattr(
+            balancer, "_analyze_products",
+            lambda *args, **kwargs: calls.append(1) or original(*args, **kwargs)
+        )
+
+        results = balancer.execute(df, header_row=7, previews=previews)
+
+        assert calls == []
+        assert len(results) == 1
+        assert results[0].receiver == "Сток"
+
+
+class TestCountSizesPerStore:
+    """Distinct sizes with stock per store column."""
+
+    def test_unique_variants_count_rows_with_stock(self):
+        has_stock = np.array([[True, False], [True, True], [False, False]])
+        counts = _count_sizes_per_store(np.array([0, 1, 2]), has_stock)
+        assert counts.tolist() == [2, 1]
+
+    def test_duplicate_variants_counted_once(self):
+        has_stock = np.array([
+            [True, False],
+            [True, False],
+            [False, True],
+            [False, True],
+        ])
+        counts = _count_sizes_per_store(np.array([1, 1, 0, 1]), has_stock)
+        assert counts.tolist() == [1, 2]
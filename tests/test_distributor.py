@@ -11,7 +11,7 @@ before the next begins (fair distribution).
 
 import pytest
 from core.distributor import StockDistributor
-from core.models import DistributionConfig
+from core.models import DistributionConfig, Transfer, TransferPreview
 from tests.conftest import create_test_row, create_test_df, STORE_COLS
 
 
@@ -382,3 +382,51 @@ class TestExcelRowCalculation:
         previews = StockDistributor(cfg).preview(df, source="stock", header_row=6)
 
         assert sorted([p.row_index for p in previews]) == [9, 10, 11]
+
+
+class TestReusePreviews:
+    """execute/generate_updated_inventory accept previews from a prior preview()."""
+
+    def test_execute_with_previews_skips_recompute(self, monkeypatch):
+        rows = [
+            create_test_row("P", "S1", stock=5),
+            create_test_row("P", "S2", stock=5),
+            create_test_row("P", "S3", stock=5),
+        ]
+        df = create_test_df(rows)
+        distributor = StockDistributor(_make_config(target_sizes_filled=3))
+
+        expected = distributor.execute(df, "stock", header_row=7)
+        previews = distributor.preview(df, "stock", header_row=7)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("preview() should not be called")
+
+        monkeypatch.setattr(distributor, "preview", fail)
+        results = distributor.execute(df, "stock", header_row=7, previews=previews)
+
+        assert [(r.sender, r.receiver) for r in results] == [(r.sender, r.receiver) for r in expected]
+        assert all(a.data.equals(b.data) for a, b in zip(results, expected))
+
+
+class TestExecuteGrouping:
+    """execute() writes one file per (sender, full store name)."""
+
+    def test_stores_sharing_a_code_get_separate_files(self):
+        store_a = "0123456 ТЦ Восток"
+        store_b = "0123456 ТЦ Запад"
+        previews = [
+            TransferPreview(row_index=9, product_name="P", variant="S1", transfers=[
+                Transfer("Сток", store_a, 1), Transfer("Сток", store_b, 2),
+            ]),
+            TransferPreview(row_index=10, product_name="P", variant="S2", transfers=[
+                Transfer("Сток", store_b, 3),
+            ]),
+        ]
+        distributor = StockDistributor(_make_config(store_priority=[store_a, store_b]))
+
+        results = distributor.execute(None, "stock", header_row=7, previews=previews)
+
+        assert [(r.sender, r.receiver) for r in results] == [("Сток", "0123456"), ("Сток", "0123456")]
+        assert [r.data["Количество"].tolist() for r in results] == [[1], [2, 3]]
+        assert all(r.filename.startswith("Сток_to_0123456_") for r in results)
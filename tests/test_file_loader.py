@@ -0,0 +1,64 @@
+"""Tests for Excel loading with header detection."""
+
+import io
+
+import pandas as pd
+from openpyxl import Workbook
+
+from core.config import EXCEL_ENGINE
+from core.file_loader import find_header_row, load_excel_with_header
+
+
+def _make_workbook() -> bytes:
+    """Title rows, header, sub-header, then mixed data (formula, text, blanks)."""
+    wb = Workbook()
+    ws = wb.active
+    ws.cell(row=2, column=1, value="Отчёт по остаткам")
+    header = ["Номенклатура", "Характеристика", "Сток", "125006 KZN-PC-Мега", "125006 KZN-PC-Мега", None]
+    for col, name in enumerate(header, start=1):
+        ws.cell(row=5, column=col, value=name)
+        ws.cell(row=6, column=col, value="Остаток на складе")
+    rows = [
+        ["Шорты_C1", "S", 3, None, 1, None],
+        ["Шорты_C1", "M", 2.0, "=SUM(C7:C8)", 2, None],
+        ["Шорты_C1", None, "x", 1.5, 3, None],
+        [None] * 6,
+        ["Джемпер_C2", "XL", 1, 1, 1, "z"],
+    ]
+    for r, values in enumerate(rows, start=7):
+        for col, value in enumerate(values, start=1):
+            ws.cell(row=r, column=col, value=value)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+class TestLoadExcelWithHeader:
+    """load_excel_with_header parses once but matches the two-step read."""
+
+    def test_matches_find_header_then_read_excel(self):
+        data = _make_workbook()
+
+        stream = io.BytesIO(data)
+        header_row, err = find_header_row(stream)
+        assert err is None
+        expected = pd.read_excel(
+            stream, header=header_row, skiprows=[header_row + 1], engine=EXCEL_ENGINE
+        )
+
+        df, loaded_header_row, err = load_excel_with_header(io.BytesIO(data))
+
+        assert err is None
+        assert loaded_header_row == header_row == 4
+        pd.testing.assert_frame_equal(df, expected)
+
+    def test_missing_header_returns_error(self):
+        wb = Workbook()
+        wb.active.cell(row=1, column=1, value="Нет заголовка")
+        buf = io.BytesIO()
+        wb.save(buf)
+
+        df, header_row, err = load_excel_with_header(io.BytesIO(buf.getvalue()))
+
+        assert df is None and header_row is None
+        assert "Номенклатура" in err
@@ -0,0 +1,73 @@
+"""Tests for column-wise filter helpers."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.filters import (
+    extract_article_name,
+    extract_article_names,
+    format_filter_value,
+    format_filter_values,
+)
+
+
+class TestVectorizedFilterHelpers:
+    """Column-wise helpers match their per-value counterparts."""
+
+    def test_extract_article_names_matches_single(self):
+        values = pd.Series([
+            "Мужские шорты_C3 34770.4007/6214",
+            " Джемпер _C5 50706_extra",
+            "Без кода",
+            None,
+            np.nan,
+            123,
+        ])
+        expected = [extract_article_name(v) for v in values]
+        assert extract_article_names(values).tolist() == expected
+
+    def test_format_filter_values_matches_single(self):
+        values = pd.Series([2221.0, 2221.0, "Весна-Лето", np.nan, 12.5, None, 7])
+        expected = [format_filter_value(v) for v in values]
+        assert format_filter_values(values).tolist() == expected
+
+    def test_format_filter_values_keeps_index(self):
+        values = pd.Series([1.0, 2.0], index=[10, 20])
+        assert format_filter_values(values).index.tolist() == [10, 20]
+
+
+class TestPrecomputedColumns:
+    """Filters accept derived columns computed once by the caller."""
+
+    def test_article_types_use_given_names(self, monkeypatch):
+        import core.filters as filters
+
+        df = pd.DataFrame({"Номенклатура": ["Шорты_C1", "Джемпер_C2", "Шорты_C3"]})
+        names = filters.extract_article_names(df["Номенклатура"])
+        monkeypatch.setattr(
+            filters, "extract_article_names",
+            lambda values: pytest.fail("article names recomputed")
+        )
+
+        assert filters.get_unique_article_types(df, names) == ["Джемпер", "Шорты"]
+        result = filters.apply_article_type_filter(df, ["Шорты"], names)
+        assert result["Номенклатура"].tolist() == ["Шорты_C1", "Шорты_C3"]
+
+    def test_article_filter_without_names_matches(self):
+        from core.filters import apply_article_type_filter
+
+        df = pd.DataFrame({"Номенклатура": ["Шорты_C1", "Джемпер_C2", None]})
+
+        assert apply_article_type_filter(df, ["Джемпер"]).index.tolist() == [1]
+        # All types selected keeps rows without an article type
+        assert len(apply_article_type_filter(df, ["Шорты", "Джемпер"])) == 3
+
+    def test_collection_filter_uses_given_column(self):
+        from core.filters import apply_collection_filter, format_filter_values
+
+        df = pd.DataFrame({"Коллекция (сезон)": [2221.0, "Весна", np.nan]})
+        formatted = format_filter_values(df["Коллекция (сезон)"])
+
+        assert apply_collection_filter(df, ["2221"], formatted).index.tolist() == [0]
+        assert apply_collection_filter(df, ["2221"]).index.tolist() == [0]
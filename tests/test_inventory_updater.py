@@ -0,0 +1,129 @@
+"""Tests for writing planned transfers back into the inventory workbook."""
+
+import io
+import re
+import zipfile
+
+from openpyxl import Workbook, load_workbook
+
+from core.inventory_updater import apply_transfers_to_inventory
+from core.models import Transfer, TransferPreview
+
+
+def _make_workbook() -> io.BytesIO:
+    """Title row, header on row 3, then two product rows."""
+    wb = Workbook()
+    ws = wb.active
+    ws.cell(row=1, column=1, value="Отчёт по остаткам")
+    header = ["Номенклатура", "Характеристика", "Сток", "125006 KZN-PC-Мега", "125007 MSK-PC-Гагаринский"]
+    for col, name in enumerate(header, start=1):
+        ws.cell(row=3, column=col, value=name)
+    ws.append(["Шорты_C1", "S", 5, None, 1])
+    ws.append(["Шорты_C1", "M", 2, 0, None])
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+def _with_stale_dimension(buf: io.BytesIO) -> io.BytesIO:
+    """Rewrite the sheet's stored <dimension> to "A1", as some exporters do."""
+    out = io.BytesIO()
+    with zipfile.ZipFile(buf) as zin, zipfile.ZipFile(out, "w") as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = re.sub(rb'<dimension ref="[^"]*"\s*/>', b'<dimension ref="A1"/>', data)
+            zout.writestr(item, data)
+    out.seek(0)
+    return out
+
+
+def _preview(row_index: int, *transfers: Transfer) -> TransferPreview:
+    return TransferPreview(row_index=row_index, product_name="Шорты_C1", variant="S", transfers=list(transfers))
+
+
+class TestApplyTransfersToInventory:
+    """Source is reduced and receivers increased in place."""
+
+    def test_applies_exact_and_prefix_receivers(self):
+        previews = [
+            _preview(
+                4,
+                Transfer(sender="Сток", receiver="125006 KZN-PC-Мега", quantity=1),
+                Transfer(sender="Сток", receiver="125007", quantity=2),
+            ),
+            _preview(5),
+        ]
+        data, warnings = apply_transfers_to_inventory(_make_workbook(), previews, "Сток", header_row=2)
+
+        ws = load_workbook(io.BytesIO(data)).active
+        assert warnings == []
+        assert [ws.cell(row=4, column=c).value for c in (3, 4, 5)] == [2, 1, 3]
+        assert [ws.cell(row=5, column=c).value for c in (3, 4, 5)] == [2, 0, None]
+
+    def test_missing_source_column_returns_original(self):
+        original = _make_workbook()
+        previews = [_preview(4, Transfer(sender="Фото склад", receiver="125006 KZN-PC-Мега", quantity=1))]
+        data, warnings = apply_transfers_to_inventory(original, previews, "Фото склад", header_row=2)
+
+        assert data == original.getvalue()
+        assert warnings == ["Столбец источника 'Фото склад' не найден"]
+
+    def test_no_transfers_returns_original(self):
+        original = _make_workbook()
+        data, warnings = apply_transfers_to_inventory(original, [_preview(4)], "Сток", header_row=2)
+
+        assert data == original.getvalue()
+        assert warnings == []
+
+    def test_repeated_row_accumulates_and_warns(self):
+        transfer = Transfer(sender="Сток", receiver="125006 KZN-PC-Мега", quantity=2)
+        previews = [_preview(5, transfer), _preview(5, transfer)]
+        data, warnings = apply_transfers_to_inventory(_make_workbook(), previews, "Сток", header_row=2)
+
+        ws = load_workbook(io.BytesIO(data)).active
+        assert [ws.cell(row=5, column=c).value for c in (3, 4)] == [0, 4]
+        assert warnings == ["Строка 5: Исходное значение (0) < Перемещение (2)"]
+
+    def test_ambiguous_store_code_uses_first_column_and_warns_once(self):
+        original = _make_workbook()
+        wb = load_workbook(original)
+        wb.active.cell(row=3, column=6, value="125007 MSK-PC-Другой")
+        buf = io.BytesIO()
+        wb.save(buf)
+        buf.seek(0)
+
+        transfer = Transfer(sender="Сток", receiver="125007", quantity=1)
+        previews = [_preview(4, transfer), _preview(5, transfer)]
+        data, warnings = apply_transfers_to_inventory(buf, previews, "Сток", header_row=2)
+
+        ws = load_workbook(io.BytesIO(data)).active
+        assert [ws.cell(row=r, column=5).value for r in (4, 5)] == [2, 1]
+        assert ws.cell(row=4, column=6).value is None
+        assert len(warnings) == 1 and "125007" in warnings[0]
+
+    def test_duplicate_receivers_in_one_row_are_summed(self):
+        previews = [
+            _preview(
+                4,
+                Transfer(sender="Сток", receiver="125006 KZN-PC-Мега", quantity=1),
+                Transfer(sender="Сток", receiver="999999 Нет", quantity=1),
+                Transfer(sender="Сток", receiver="125006 KZN-PC-Мега", quantity=2),
+                Transfer(sender="Сток", receiver="999999 Нет", quantity=1),
+            ),
+        ]
+        data, warnings = apply_transfers_to_inventory(_make_workbook(), previews, "Сток", header_row=2)
+
+        ws = load_workbook(io.BytesIO(data)).active
+        assert [ws.cell(row=4, column=c).value for c in (3, 4)] == [0, 3]
+        assert warnings == ["Строка 4: Столбец назначения '999999 Нет' не найден"]
+
+    def test_stale_sheet_dimension_still_finds_header(self):
+        previews = [_preview(4, Transfer(sender="Сток", receiver="125006 KZN-PC-Мега", quantity=1))]
+        stale = _with_stale_dimension(_make_workbook())
+        data, warnings = apply_transfers_to_inventory(stale, previews, "Сток", header_row=2)
+
+        ws = load_workbook(io.BytesIO(data)).active
+        assert warnings == []
+        assert [ws.cell(row=4, column=c).value for c in (3, 4)] == [4, 1]
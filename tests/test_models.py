@@ -0,0 +1,81 @@
+"""Tests for shared model helpers in core.models."""
+
+import numpy as np
+import pandas as pd
+
+from core.models import get_stock_value, get_stock_matrix, group_row_positions
+
+
+class TestGetStockMatrix:
+    """get_stock_matrix must match get_stock_value applied per cell."""
+
+    def test_matches_get_stock_value(self):
+        values = [3, " 3", 2.7, -1.5, "", None, float("nan"), "Остаток на складе", "abc", True]
+        df = pd.DataFrame({"A": values, "B": list(reversed(values))})
+
+        matrix = get_stock_matrix(df, ["A", "B"])
+
+        assert matrix.shape == (len(values), 2)
+        assert matrix[:, 0].tolist() == [get_stock_value(v) for v in df["A"]]
+        assert matrix[:, 1].tolist() == [get_stock_value(v) for v in df["B"]]
+
+    def test_no_columns(self):
+        df = pd.DataFrame({"A": [1, 2]})
+
+        matrix = get_stock_matrix(df, [])
+
+        assert matrix.shape == (2, 0)
+
+    def test_mixed_numeric_and_text_columns(self):
+        df = pd.DataFrame({
+            "num": [1.9, None, 4.0],
+            "int": [1, 2, 3],
+            "text": ["2", "Остаток на складе", None],
+        })
+
+        matrix = get_stock_matrix(df, ["num", "int", "text"])
+
+        assert matrix.tolist() == [[1, 1, 2], [0, 2, 0], [4, 3, 0]]
+
+    def test_datetime_columns_count_as_zero(self):
+        df = pd.DataFrame({
+            "date": pd.to_datetime(["2024-01-01", None]),
+            "delta": pd.to_timedelta(["1D", None]),
+            "mixed": [pd.Timestamp("2024-01-01"), 3],
+        })
+
+        matrix = get_stock_matrix(df, ["date", "delta", "mixed"])
+
+        assert matrix.tolist() == [[0, 0, 0], [0, 0, 3]]
+        assert matrix[:, 2].tolist() == [get_stock_value(v) for v in df["mixed"]]
+
+    def test_large_values_match_get_stock_value(self):
+        df = pd.DataFrame({"ok": [1, 2], "big": [1, 3_000_000_000], "text": ["5000000000.7", "-4"]})
+
+        matrix = get_stock_matrix(df, ["ok", "big", "text"])
+
+        assert matrix.tolist() == [
+            [get_stock_value(v) for v in row] for row in df.itertuples(index=False)
+        ]
+
+    def test_infinite_values_are_clipped(self):
+        df = pd.DataFrame({"inf": [float("inf"), float("-inf"), 7.0]})
+
+        values = get_stock_matrix(df, ["inf"])[:, 0].tolist()
+
+        assert values[0] == 2 ** 53 and values[1] == -(2 ** 53) and values[2] == 7
+
+
+class TestGroupRowPositions:
+    """group_row_positions keeps name and row order like groupby(sort=False)."""
+
+    def test_first_appearance_order(self):
+        names = np.array(["B", "A", "B", "C", "A"], dtype=object)
+
+        groups = group_row_positions(names)
+
+        assert list(groups) == ["B", "A", "C"]
+        assert [g.tolist() for g in groups.values()] == [[0, 2], [1, 4], [3]]
+
+    def test_empty(self):
+        assert group_row_positions(np.array([], dtype=object)) == {}
@@ -12,6 +12,7 @@ from core.sales_parser import (
 from core.models import (
     extract_store_id,
     build_store_id_map,
+    build_priority_rank,
     SalesPriorityData,
     ProductSalesData,
     StoreSales,
@@ -172,6 +173,14 @@ class TestProductSalesData:
         assert priority[1] == "125007 MSK-PC-Гагаринский"
         assert priority[2] == "130143 MSK-PCM-Мега 2 Химки"
 
+        # A precomputed rank gives the same order
+        assert product.get_priority_order(fallback, store_id_map, build_priority_rank(fallback)) == priority
+
+    def test_build_priority_rank_keeps_first_position(self):
+        """Duplicates rank like list.index (first occurrence)."""
+        rank = build_priority_rank(["A", "B", "A", "C"])
+        assert rank == {"A": 0, "B": 1, "C": 3}
+
 
 class TestSalesPriorityData:
     """Tests for SalesPriorityData."""
@@ -267,3 +276,22 @@ class TestParseSalesFile:
         assert len(product2.store_sales) == 1
         assert product2.store_sales[0].store_id == 125006
         assert product2.store_sales[0].quantity == 4
+
+    def test_parse_skips_orphan_stores_and_bad_quantities(self):
+        """Stores before the first product are ignored; bad quantities count as 0."""
+        df = pd.DataFrame({
+            0: ["125007 MSK-PC-Гагаринский", "Джемпер_C2 50706", "Итого", "125006 KZN-PC-Мега", None, "0130143 MSK-PCM-Мега 2 Химки"],
+            1: [None] * 6,
+            2: [None] * 6,
+            3: [5, 7.9, 100, "нет", 3, None],
+        })
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False, header=False)
+        buffer.seek(0)
+
+        result = parse_sales_file(buffer)
+
+        assert list(result.products) == ["C2 50706"]
+        product = result.products["C2 50706"]
+        assert product.total_quantity == 7
+        assert [(s.store_id, s.quantity) for s in product.store_sales] == [(125006, 0), (130143, 0)]
@@ -14,17 +14,19 @@ from core.config import (
     ARTICLE_TYPE_FILTER_LABEL,
 )
 from core.filters import (
-    extract_article_name,
-    format_filter_value,
+    extract_article_names,
     get_unique_article_types,
     get_unique_collections,
     get_unique_additional_names,
+    apply_collection_filter,
+    apply_additional_name_filter,
 )
 
 
 def render_article_type_filter(
     df: pd.DataFrame,
     prefix: str,
+    article_types: list[str] | None = None,
 ) -> list[str]:
     """Render article type filter as checkbox expander with form.
     
@@ -33,12 +35,14 @@ def render_article_type_filter(
     Args:
         df: Input DataFrame
         prefix: Unique prefix for widget keys
+        article_types: Optional precomputed get_unique_article_types(df)
         
     Returns:
         List of selected article types
     """
     # Extract unique article types
-    article_types = get_unique_article_types(df)
+    if article_types is None:
+        article_types = get_unique_article_types(df)
     
     if not article_types:
         return []
@@ -141,22 +145,20 @@ def render_filters(df: pd.DataFrame, prefix: str) -> pd.DataFrame:
     if not has_collection and not has_additional_name and not has_nomenclature:
         return df
 
-    filtered_df = df.copy()
+    # No copy: each filter below builds a new frame by boolean indexing and
+    # downstream code only reads the result
+    filtered_df = df
 
     # 1. Article type filter FIRST (checkbox expander)
     if has_nomenclature:
-        # Get all unique article types for comparison
-        all_article_types = set(get_unique_article_types(df))
-        selected_types = render_article_type_filter(df, prefix)
-        if selected_types:
-            # If all types are selected, include rows with empty article type too
-            if set(selected_types) == all_article_types:
-                # No filtering needed - all types selected
-                pass
-            else:
-                filtered_df = filtered_df[
-                    filtered_df[PRODUCT_NAME_COLUMN].apply(extract_article_name).isin(selected_types)
-                ]
+        # Article names are derived once per render and shared by the
+        # option list and the filter itself
+        article_names = extract_article_names(df[PRODUCT_NAME_COLUMN])
+        all_article_types = get_unique_article_types(df, article_names)
+        selected_types = render_article_type_filter(df, prefix, all_article_types)
+        # If all types are selected, include rows with empty article type too
+        if selected_types and set(selected_types) != set(all_article_types):
+            filtered_df = filtered_df[article_names.isin(selected_types)]
 
     # 2. Collection filter (multiselect)
     if has_collection:
@@ -171,10 +173,7 @@ def render_filters(df: pd.DataFrame, prefix: str) -> pd.DataFrame:
                 placeholder="Выберите...",
                 help="Оставьте пустым, чтобы включить всё"
             )
-            if selected_collections:
-                filtered_df = filtered_df[
-                    filtered_df[COLLECTION_COLUMN].apply(format_filter_value).isin(selected_collections)
-                ]
+            filtered_df = apply_collection_filter(filtered_df, selected_collections)
 
     # 3. Additional name filter (multiselect)
     if has_additional_name:
@@ -189,10 +188,7 @@ def render_filters(df: pd.DataFrame, prefix: str) -> pd.DataFrame:
                 placeholder="Выберите...",
                 help="Оставьте пустым, чтобы включить всё"
             )
-            if selected_names:
-                filtered_df = filtered_df[
-                    filtered_df[ADDITIONAL_NAME_COLUMN].apply(format_filter_value).isin(selected_names)
-                ]
+            filtered_df = apply_additional_name_filter(filtered_df, selected_names)
 
     # Show filter summary
     if len(filtered_df) != len(df):
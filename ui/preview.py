@@ -5,6 +5,7 @@ import pandas as pd
 import io
 from datetime import datetime
 
+from core.config import EXCEL_WRITER_ENGINE
 from core.models import TransferPreview
 
 
@@ -14,7 +15,18 @@ def generate_problems_excel(previews: list[TransferPreview]) -> tuple[bytes, int
     Returns:
         Tuple of (excel_bytes, problem_count)
     """
-    problems = []
+    # Columnar: one list per output column, no dict per problem row
+    columns: dict[str, list] = {
+        "Строка": [], "Артикул": [], "Вариант": [], "Проблема": [], "Магазин": [], "Детали": [],
+    }
+
+    def add_problem(p: TransferPreview, problem: str, store: str, details: str) -> None:
+        columns["Строка"].append(p.row_index)
+        columns["Артикул"].append(p.product_name)
+        columns["Вариант"].append(p.variant or "—")
+        columns["Проблема"].append(problem)
+        columns["Магазин"].append(store)
+        columns["Детали"].append(details)
 
     for p in previews:
         if not p.has_transfers:
@@ -22,45 +34,25 @@ def generate_problems_excel(previews: list[TransferPreview]) -> tuple[bytes, int
 
         # Fallback priority (product not in sales data)
         if p.uses_fallback_priority:
-            problems.append({
-                "Строка": p.row_index,
-                "Артикул": p.product_name,
-                "Вариант": p.variant or "—",
-                "Проблема": "📊 Нет в продажах",
-                "Магазин": "—",
-                "Детали": "Товар не найден в данных продаж",
-            })
+            add_problem(p, "📊 Нет в продажах", "—", "Товар не найден в данных продаж")
 
         # Skipped stores
         for skipped in p.skipped_stores:
             store_id = skipped.store_name.split()[0] if skipped.store_name else skipped.store_name
 
             if skipped.reason == "target_not_reached":
-                problems.append({
-                    "Строка": p.row_index,
-                    "Артикул": p.product_name,
-                    "Вариант": p.variant or "—",
-                    "Проблема": "📉 Цель не достигнута",
-                    "Магазин": store_id,
-                    "Детали": "Недостаточно размеров для достижения цели",
-                })
+                add_problem(p, "📉 Цель не достигнута", store_id, "Недостаточно размеров для достижения цели")
             elif skipped.reason == "excluded":
-                problems.append({
-                    "Строка": p.row_index,
-                    "Артикул": p.product_name,
-                    "Вариант": p.variant or "—",
-                    "Проблема": "🚫 Исключённые",
-                    "Магазин": store_id,
-                    "Детали": "Магазин исключён из распределения",
-                })
-
-    if not problems:
+                add_problem(p, "🚫 Исключённые", store_id, "Магазин исключён из распределения")
+
+    problem_count = len(columns["Строка"])
+    if not problem_count:
         return b"", 0
 
-    df = pd.DataFrame(problems)
+    df = pd.DataFrame(columns)
     excel_buffer = io.BytesIO()
-    df.to_excel(excel_buffer, index=False, sheet_name="Замечания")
-    return excel_buffer.getvalue(), len(problems)
+    df.to_excel(excel_buffer, index=False, sheet_name="Замечания", engine=EXCEL_WRITER_ENGINE)
+    return excel_buffer.getvalue(), problem_count
 
 
 def render_preview(previews: list[TransferPreview], prefix: str = "default"):
@@ -9,6 +9,7 @@ import zipfile
 from datetime import datetime
 from typing import Optional
 
+from core.config import EXCEL_WRITER_ENGINE
 from core.models import TransferResult, UpdatedInventoryResult
 
 
@@ -28,13 +29,18 @@ def render_results(
     total_items = sum(r.item_count for r in results)
     st.metric("Всего записей", total_items)
 
+    # Serialize each file once; the ZIP and the individual buttons share the bytes
+    excel_files: list[bytes] = []
+    for result in results:
+        excel_buffer = io.BytesIO()
+        result.data.to_excel(excel_buffer, index=False, engine=EXCEL_WRITER_ENGINE)
+        excel_files.append(excel_buffer.getvalue())
+
     # ZIP download
     zip_buffer = io.BytesIO()
     with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for result in results:
-            excel_buffer = io.BytesIO()
-            result.data.to_excel(excel_buffer, index=False)
-            zip_file.writestr(result.filename, excel_buffer.getvalue())
+        for result, excel_bytes in zip(results, excel_files):
+            zip_file.writestr(result.filename, excel_bytes)
 
     st.download_button(
         label="Скачать всё в ZIP",
@@ -47,17 +53,14 @@ def render_results(
     st.divider()
     st.subheader("Отдельные файлы")
 
-    for result in results:
+    for result, excel_bytes in zip(results, excel_files):
         col1, col2, col3 = st.columns([3, 1, 1])
         col1.markdown(f"**{result.filename}**")
         col2.write(f"{result.item_count} записей")
 
-        excel_buffer = io.BytesIO()
-        result.data.to_excel(excel_buffer, index=False)
-
         col3.download_button(
             label="Скачать",
-            data=excel_buffer.getvalue(),
+            data=excel_bytes,
             file_name=result.filename,
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             key=f"download_{result.filename}",
@@ -67,6 +67,9 @@ def init_session_state():
         st.session_state.sales_priority_data = None
     if "sales_file_name" not in st.session_state:
         st.session_state.sales_file_name = None
+    # sales_file_identity: content hash of the parsed sales upload (skip re-parsing on reruns)
+    if "sales_file_identity" not in st.session_state:
+        st.session_state.sales_file_identity = None
 
 
 def move_store_up(idx: int):